@@ -3,7 +3,7 @@ export interface MaintenanceAlert {
   _id: string;
   userId: string;
   machineId: string;
-  alertType: 'temperature' | 'vibration' | 'wear' | 'failure_prediction' | 'maintenance_due';
+  alertType: 'temperature' | 'voltage' | 'vibration' | 'wear' | 'failure_prediction' | 'maintenance_due';
   severity: 'low' | 'medium' | 'high' | 'critical';
   message: string;
   predictedFailureDate?: Date;
@@ -15,6 +15,8 @@ export interface MaintenanceAlert {
     firstName: string;
     lastName: string;
   };
+  occurrences?: number;
+  lastSeenAt?: Date;
   emailSent: boolean;
   emailSentAt?: Date;
   createdAt: Date;
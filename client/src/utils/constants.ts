@@ -10,6 +10,7 @@ export const SEVERITY_COLORS = {
 
 export const ALERT_TYPE_LABELS = {
   temperature: 'Temperature',
+  voltage: 'Voltage',
   vibration: 'Vibration',
   wear: 'Wear',
   failure_prediction: 'Failure Prediction',
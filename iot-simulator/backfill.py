@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# backfill.py
+"""
+Historical backfill generator
+Runs the SensorSimulator state machine on a virtual clock to produce days of
+telemetry for many machines as fast as the CPU allows. Machines are generated
+in parallel worker processes with per-machine deterministic seeds, and output
+is streamed to chunked JSONL/Parquet files or into the bulk ingest endpoint.
+"""
+
+import os
+import gzip
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+from config import *
+from mqtt_client import APIClient
+from sensor_simulator import SensorSimulator
+from scenarios import ScenarioEngine
+
+
+class VirtualClock:
+    """Drop-in replacement for datetime.now that only moves when advanced"""
+
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def to_api_record(payload, timestamp):
+    """Convert an industrial payload to the backend's SensorData field names"""
+    additional = payload.get('additional_sensors', {})
+    return {
+        'machineId': payload['machine_id'],
+        'motorSpeed': payload['motor_speed'],
+        'voltage': payload['voltage'],
+        'temperature': payload['temperature'],
+        'heat': payload['heat'],
+        'workingStatus': payload['working_status'],
+        'workingPeriod': payload['working_period'],
+        'pressure': additional.get('pressure'),
+        'vibration': additional.get('vibration'),
+        'humidity': additional.get('humidity'),
+        'timestamp': timestamp
+    }
+
+
+class JsonlChunkWriter:
+    def __init__(self, output_dir, prefix, chunk_rows=BACKFILL_CHUNK_ROWS, compress=False, **_):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.file = None
+        self.rows_in_chunk = 0
+        self.paths = []
+
+    def rotate(self):
+        if self.file:
+            self.file.close()
+        extension = 'jsonl.gz' if self.compress else 'jsonl'
+        path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.paths):05d}.{extension}")
+        self.file = gzip.open(path, 'wt', compresslevel=6) if self.compress else open(path, 'w')
+        self.paths.append(path)
+        self.rows_in_chunk = 0
+
+    def write(self, record):
+        if self.file is None or self.rows_in_chunk >= self.chunk_rows:
+            self.rotate()
+        self.file.write(json.dumps({**record, 'timestamp': record['timestamp'].isoformat()}) + '\n')
+        self.rows_in_chunk += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, output_dir, prefix, chunk_rows=BACKFILL_CHUNK_ROWS, **_):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+
+        self.pyarrow = pyarrow
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.buffer = []
+        self.paths = []
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.paths):05d}.parquet")
+        self.pyarrow.parquet.write_table(self.pyarrow.Table.from_pylist(self.buffer), path)
+        self.paths.append(path)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+
+class IngestWriter:
+    def __init__(self, token=None, batch_size=BACKFILL_BATCH_SIZE, **_):
+        self.api_client = APIClient(token=token)
+        self.batch_size = batch_size
+        self.buffer = []
+        self.failed_batches = 0
+        self.paths = []
+
+    def write(self, record):
+        self.buffer.append({**record, 'timestamp': record['timestamp'].isoformat()})
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer and not self.api_client.send_sensor_data_bulk(self.buffer):
+            self.failed_batches += 1
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+
+WRITERS = {
+    'jsonl': JsonlChunkWriter,
+    'parquet': ParquetChunkWriter,
+    'ingest': IngestWriter,
+}
+
+
+def backfill_machine(task):
+    """Generate the full history of one machine; runs in a worker process"""
+    machine_id = task['machine_id']
+    clock = VirtualClock(task['start'])
+    ticks = int(task['days'] * 86400 / task['interval'])
+
+    scenarios = []  # no scenarios, even if SCENARIOS is set in the environment
+    if task['scenarios']:
+        scenarios = ScenarioEngine(task['scenarios'], seed=task['seed'])
+        scenarios.schedule_random([machine_id], horizon=ticks, mean_gap=task['scenario_gap'])
+
+    simulator = SensorSimulator(machine_ids=[machine_id], seed=f"{task['seed']}:{machine_id}",
+                                use_mqtt=False, use_api=False, clock=clock, scenarios=scenarios)
+    simulator.logger.setLevel(logging.ERROR)
+    machine = simulator.machine_states[machine_id]
+
+    writer = WRITERS[task['format']](prefix=machine_id, **task['writer_options'])
+    maintenance_interval = timedelta(days=task['maintenance_days'])
+
+    started = time.perf_counter()
+    try:
+        for _ in range(ticks):
+            if task['maintenance_days'] and clock() - machine['last_maintenance'] >= maintenance_interval:
+                simulator.perform_maintenance(machine_id)
+            for payload in simulator.step():
+                writer.write(to_api_record(payload, clock()))
+            clock.advance(task['interval'])
+    finally:
+        writer.close()
+
+    return {
+        'machine_id': machine_id,
+        'rows': ticks,
+        'seconds': time.perf_counter() - started,
+        'files': writer.paths,
+        'failed_batches': getattr(writer, 'failed_batches', 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=float, required=True, help='days of history per machine')
+    parser.add_argument('--machines', type=int, default=MAX_MACHINES, help='number of machines')
+    parser.add_argument('--interval', type=float, default=SIMULATION_INTERVAL,
+                        help='virtual seconds between readings')
+    parser.add_argument('--start', type=datetime.fromisoformat,
+                        help='ISO start time (default: midnight today minus --days)')
+    parser.add_argument('--seed', type=int, default=42, help='base seed; each machine derives its own')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('--output', default=BACKFILL_OUTPUT_DIR, help='output directory for files')
+    parser.add_argument('--chunk-rows', type=int, default=BACKFILL_CHUNK_ROWS, help='rows per file')
+    parser.add_argument('--gzip', action='store_true', help='gzip JSONL chunks')
+    parser.add_argument('--maintenance-days', type=int, default=BACKFILL_MAINTENANCE_DAYS,
+                        help='service machines this often (0 lets wear accumulate)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="comma-separated fault scenarios, or 'all' (default: random anomalies)")
+    parser.add_argument('--scenario-gap', type=int, default=SCENARIO_MEAN_GAP,
+                        help='mean healthy ticks between scenario faults')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('Backfill')
+
+    start = args.start or (datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                           - timedelta(days=args.days))
+    writer_options = {'output_dir': args.output, 'chunk_rows': args.chunk_rows, 'compress': args.gzip}
+
+    if args.format == 'ingest':
+        # Log in once; workers reuse the token instead of each hitting the auth rate limit
+        api_client = APIClient()
+        if not api_client.authenticated:
+            logger.error("❌ Cannot authenticate for bulk ingest")
+            return
+        writer_options = {'token': api_client.token}
+    else:
+        os.makedirs(args.output, exist_ok=True)
+
+    tasks = [{
+        'machine_id': f"MACHINE-SIM-{i:03d}",
+        'seed': args.seed,
+        'start': start,
+        'days': args.days,
+        'interval': args.interval,
+        'format': args.format,
+        'maintenance_days': args.maintenance_days,
+        'scenarios': [name for name in args.scenarios.split(',') if name],
+        'scenario_gap': args.scenario_gap,
+        'writer_options': writer_options
+    } for i in range(1, args.machines + 1)]
+
+    logger.info(f"🕰️ Backfilling {args.days} days x {args.machines} machines from {start.isoformat()} "
+                f"({args.format}, {args.workers} workers)")
+
+    started = time.perf_counter()
+    total_rows = 0
+    with Pool(args.workers) as pool:
+        for result in pool.imap_unordered(backfill_machine, tasks):
+            total_rows += result['rows']
+            logger.info(f"✅ {result['machine_id']}: {result['rows']} rows in {result['seconds']:.1f}s"
+                        f"{' (' + str(result['failed_batches']) + ' failed batches)' if result['failed_batches'] else ''}")
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"📈 {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
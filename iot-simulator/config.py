@@ -50,6 +50,8 @@ INDUSTRIAL_SENSORS = [
 # Simulation Settings
 SIMULATION_INTERVAL = int(os.getenv('SIMULATION_INTERVAL', 10))  # seconds
 MAX_MACHINES = int(os.getenv('MAX_MACHINES', 3))
+# Extend the fleet with generated ids when more machines are requested
+MACHINE_IDS += [f'MACHINE-SIM-{i:03d}' for i in range(len(MACHINE_IDS) + 1, MAX_MACHINES + 1)]
 ENABLE_ANOMALIES = os.getenv('ENABLE_ANOMALIES', 'true').lower() == 'true'
 ANOMALY_PROBABILITY = float(os.getenv('ANOMALY_PROBABILITY', 0.05))  # 5% chance
 
@@ -96,3 +98,37 @@ SENSOR_RANGES = {
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = os.getenv('LOG_FILE', 'iot_simulator.log')
+
+# Ground-truth anomaly labels (JSON lines), disabled when empty
+ANOMALY_LABELS_FILE = os.getenv('ANOMALY_LABELS_FILE', '')
+
+# Profiling (see ml-service/services/profiler.py)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')  # sampling or cprofile
+PROFILE_DURATION = float(os.getenv('PROFILE_DURATION', 30))  # seconds
+PROFILE_MAX_DURATION = float(os.getenv('PROFILE_MAX_DURATION', 300))  # longest session a request may ask for
+PROFILE_STAGES = [stage for stage in os.getenv('PROFILE_STAGES', '').split(',') if stage]
+
+# Multi-tenant simulation (see tenants.py)
+TENANT_COUNT = int(os.getenv('TENANT_COUNT', 10))
+TENANT_EMAIL_TEMPLATE = os.getenv('TENANT_EMAIL_TEMPLATE', 'tenant{n:03d}@sim.iot.com')
+TENANT_PASSWORD = os.getenv('TENANT_PASSWORD', 'Tenant@123456')
+TENANT_POOL_SIZE = int(os.getenv('TENANT_POOL_SIZE', 4))  # HTTP connections per tenant
+TENANT_WORKERS = int(os.getenv('TENANT_WORKERS', 16))  # concurrent tenant senders
+TENANT_REPORT_INTERVAL = int(os.getenv('TENANT_REPORT_INTERVAL', 60))  # seconds
+ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin@iot.com')
+ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'Admin@123456')
+
+# Historical backfill (see backfill.py)
+BACKFILL_OUTPUT_DIR = os.getenv('BACKFILL_OUTPUT_DIR', 'backfill')
+BACKFILL_CHUNK_ROWS = int(os.getenv('BACKFILL_CHUNK_ROWS', 100000))  # rows per output file
+BACKFILL_BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', 1000))  # rows per bulk ingest request
+BULK_MAX_RETRIES = int(os.getenv('BULK_MAX_RETRIES', 8))  # rate-limited retries of one batch
+BULK_MAX_BACKOFF = float(os.getenv('BULK_MAX_BACKOFF', 900))  # longest wait between retries (s)
+BACKFILL_MAINTENANCE_DAYS = int(os.getenv('BACKFILL_MAINTENANCE_DAYS', 30))  # 0 disables servicing
+
+# Correlated fault scenarios (see scenarios.py); empty keeps independent random anomalies
+SCENARIOS = [name for name in os.getenv('SCENARIOS', '').split(',') if name]  # names or 'all'
+SCENARIO_FILE = os.getenv('SCENARIO_FILE', '')  # JSON file with extra scenario definitions
+SCENARIO_MEAN_GAP = int(os.getenv('SCENARIO_MEAN_GAP', 2000))  # mean healthy ticks between faults
+SCENARIO_HORIZON = int(os.getenv('SCENARIO_HORIZON', 100000))  # ticks scheduled ahead
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# detection_benchmark.py
+"""
+Detection latency benchmark
+Replays a seeded simulator workload through the ml-service detectors and the
+Node threshold rules, scoring them against the simulator's ground-truth labels
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+from config import SCENARIOS, SCENARIO_MEAN_GAP
+from sensor_simulator import SensorSimulator
+from scenarios import ScenarioEngine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml-service'))
+from models.anomaly_detection import DETECTORS  # noqa: E402
+
+# Sensors that create_industrial_payload overwrites while a machine is offline
+OFFLINE_OVERRIDDEN_SENSORS = {'motor_speed', 'voltage', 'heat', 'working_period'}
+
+
+def flatten_payload(payload):
+    """Flatten an industrial payload into a sensor -> value reading"""
+    reading = {
+        key: value for key, value in payload.items()
+        if key not in ('machine_id', 'timestamp', 'additional_sensors')
+    }
+    reading.update(payload.get('additional_sensors', {}))
+    return reading
+
+
+def generate_workload(ticks, machine_count, seed, anomaly_probability=None, scenarios=None,
+                      scenario_gap=SCENARIO_MEAN_GAP):
+    """Run the simulator and return (readings per tick, ground-truth labels)"""
+    labels = []
+    machine_ids = [f"MACHINE-SIM-{i + 1:03d}" for i in range(machine_count)]
+
+    engine = []  # no scenarios, even if SCENARIOS is set in the environment
+    if scenarios:
+        engine = ScenarioEngine(scenarios, seed=seed)
+        engine.schedule_random(machine_ids, horizon=ticks, mean_gap=scenario_gap)
+
+    simulator = SensorSimulator(machine_ids=machine_ids, seed=seed, use_mqtt=False,
+                                use_api=False, label_sink=labels.append, scenarios=engine)
+    simulator.logger.setLevel(logging.ERROR)
+    if anomaly_probability is not None:
+        simulator.anomaly_probability = anomaly_probability
+
+    workload = []
+    offline = set()
+    for tick in range(ticks):
+        readings = []
+        for payload in simulator.step():
+            readings.append((payload['machine_id'], flatten_payload(payload)))
+            if not payload['working_status']:
+                offline.add((tick, payload['machine_id']))
+        workload.append(readings)
+
+    # Anomalies on sensors that were overwritten by the offline state never reached the wire
+    labels = [
+        label for label in labels
+        if not ((label['tick'], label['machine_id']) in offline
+                and label['sensor_type'] in OFFLINE_OVERRIDDEN_SENSORS)
+    ]
+    return workload, labels
+
+
+def run_detector(detector, workload):
+    """Score the workload and return (alarms, scoring seconds, readings scored)"""
+    detector.reset()
+    alarms = []
+    elapsed = 0.0
+    scored = 0
+
+    for tick, readings in enumerate(workload):
+        for machine_id, reading in readings:
+            start = time.perf_counter()
+            flagged = detector.score(machine_id, reading)
+            elapsed += time.perf_counter() - start
+            scored += 1
+            for sensor in flagged:
+                alarms.append((tick, machine_id, sensor))
+
+    return alarms, elapsed, scored
+
+
+def evaluate(labels, alarms, window):
+    """Match alarms to labels until their fault ends, or within `window` ticks of a point anomaly"""
+    alarm_ticks = {}
+    for tick, machine_id, sensor in alarms:
+        alarm_ticks.setdefault((machine_id, sensor), []).append(tick)
+
+    latencies = []
+    detected_by_type = {}
+    total_by_type = {}
+    label_spans = {}
+
+    for label in labels:
+        key = (label['machine_id'], label['sensor_type'])
+        # Scenario faults ramp up over hundreds of ticks and stay detectable until they end
+        last = label['until_tick'] - 1 if 'until_tick' in label else label['tick'] + window
+        label_spans.setdefault(key, []).append((label['tick'], last))
+        anomaly_type = label['anomaly_type']
+        total_by_type[anomaly_type] = total_by_type.get(anomaly_type, 0) + 1
+
+        hits = [t for t in alarm_ticks.get(key, []) if label['tick'] <= t <= last]
+        if hits:
+            latencies.append(min(hits) - label['tick'])
+            detected_by_type[anomaly_type] = detected_by_type.get(anomaly_type, 0) + 1
+
+    true_alarms = sum(
+        1 for tick, machine_id, sensor in alarms
+        if any(first <= tick <= last for first, last in label_spans.get((machine_id, sensor), []))
+    )
+
+    return {
+        'labels': len(labels),
+        'alarms': len(alarms),
+        'precision': true_alarms / len(alarms) if alarms else 0.0,
+        'recall': len(latencies) / len(labels) if labels else 0.0,
+        'mean_ticks_to_detect': sum(latencies) / len(latencies) if latencies else None,
+        'max_ticks_to_detect': max(latencies) if latencies else None,
+        'recall_by_type': {
+            anomaly_type: detected_by_type.get(anomaly_type, 0) / total
+            for anomaly_type, total in sorted(total_by_type.items())
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=2000, help='simulation ticks to generate')
+    parser.add_argument('--machines', type=int, default=5, help='number of simulated machines')
+    parser.add_argument('--seed', type=int, default=42, help='simulator random seed')
+    parser.add_argument('--anomaly-probability', type=float, default=None,
+                        help='override ANOMALY_PROBABILITY for the run')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="comma-separated fault scenarios, or 'all' (default: random anomalies)")
+    parser.add_argument('--scenario-gap', type=int, default=SCENARIO_MEAN_GAP,
+                        help='mean healthy ticks between scenario faults')
+    parser.add_argument('--window', type=int, default=5,
+                        help='ticks after a random anomaly within which an alarm counts as a detection '
+                             '(scenario faults count until they end)')
+    parser.add_argument('--detectors', default=','.join(DETECTORS),
+                        help='comma-separated detector names')
+    parser.add_argument('--labels-out', help='write ground-truth labels as JSON lines')
+    parser.add_argument('--json', dest='json_out', help='write results as JSON')
+    args = parser.parse_args()
+
+    workload, labels = generate_workload(args.ticks, args.machines, args.seed,
+                                         args.anomaly_probability,
+                                         [name for name in args.scenarios.split(',') if name],
+                                         args.scenario_gap)
+
+    if args.labels_out:
+        with open(args.labels_out, 'w') as f:
+            for label in labels:
+                f.write(json.dumps(label) + '\n')
+
+    results = {}
+    for name in args.detectors.split(','):
+        alarms, elapsed, scored = run_detector(DETECTORS[name](), workload)
+        result = evaluate(labels, alarms, args.window)
+        result['readings_per_second'] = scored / elapsed if elapsed else None
+        results[name] = result
+
+    print(f"📊 {args.ticks} ticks x {args.machines} machines, seed {args.seed}, "
+          f"{len(labels)} labelled anomalies, window {args.window} ticks")
+    print(f"{'detector':<12}{'precision':>10}{'recall':>10}{'mean ttd':>10}{'max ttd':>9}{'readings/s':>14}")
+    for name, result in results.items():
+        mean_ttd = result['mean_ticks_to_detect']
+        max_ttd = result['max_ticks_to_detect']
+        print(
+            f"{name:<12}{result['precision']:>10.3f}{result['recall']:>10.3f}"
+            f"{mean_ttd if mean_ttd is not None else float('nan'):>10.2f}"
+            f"{max_ttd if max_ttd is not None else '-':>9}"
+            f"{result['readings_per_second'] or 0:>14,.0f}"
+        )
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,22 @@
 """
 MQTT Client for IoT Sensor Simulator
 """
+import os
+import sys
 import json
 import logging
 import time
 import paho.mqtt.client as mqtt
 from config import *
 
+# The profiler is shared with the ml-service
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml-service'))
+from services.profiler import profiler  # noqa: E402
+
 class MQTTClient:
-    def __init__(self):
-        self.client = mqtt.Client(client_id=MQTT_CLIENT_ID)
+    def __init__(self, client_id=MQTT_CLIENT_ID):
+        self.client_id = client_id
+        self.client = mqtt.Client(client_id=client_id)
         self.connected = False
         self.logger = self.setup_logging()
         self.setup_callbacks()
@@ -49,7 +56,7 @@ class MQTTClient:
             self.connected = True
             self.logger.info(f"✅ Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
             # Subscribe to command topics if needed
-            self.client.subscribe(f"iot/command/{MQTT_CLIENT_ID}")
+            self.client.subscribe(f"iot/command/{self.client_id}")
         else:
             self.connected = False
             error_messages = {
@@ -98,6 +105,20 @@ class MQTTClient:
         elif cmd_type == 'change_interval':
             new_interval = command.get('interval', SIMULATION_INTERVAL)
             self.logger.info(f"⏱️ Received interval change command: {new_interval}s")
+        elif cmd_type == 'start_profile':
+            self.logger.info("🔬 Received start profile command via MQTT")
+            try:
+                profiler.start(
+                    mode=command.get('mode', PROFILE_MODE),
+                    duration=command.get('duration', PROFILE_DURATION),
+                    stages=command.get('stages', PROFILE_STAGES),
+                    memory=command.get('memory', False)
+                )
+            except (ValueError, RuntimeError) as e:
+                self.logger.error(f"❌ Cannot start profile: {e}")
+        elif cmd_type == 'stop_profile':
+            self.logger.info("🔬 Received stop profile command via MQTT")
+            profiler.stop()
             
     def connect_to_broker(self):
         """Connect to MQTT broker"""
@@ -160,23 +181,41 @@ from datetime import datetime
 from config import *
 
 class APIClient:
-    def __init__(self):
+    def __init__(self, username=API_USERNAME, password=API_PASSWORD, token=None, pool_size=None):
         self.base_url = API_BASE_URL
+        self.username = username
+        self.password = password
         self.session = requests.Session()
         self.token = None
         self.authenticated = False
         self.logger = self.setup_logging()
         
+        # Size the connection pool for concurrent senders sharing this session
+        if pool_size:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        
         # Set default headers
         self.session.headers.update({
             'Content-Type': 'application/json',
             'User-Agent': 'IoT-Simulator/1.0'
         })
         
-        # Attempt to authenticate
-        if API_USERNAME and API_PASSWORD:
+        # Use a pre-issued token, otherwise attempt to authenticate
+        if token:
+            self.set_token(token)
+        elif self.username and self.password:
             self.authenticate()
             
+    def set_token(self, token):
+        """Use a bearer token for all subsequent requests"""
+        self.token = token
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.token}'
+        })
+        self.authenticated = True
+            
     def setup_logging(self):
         """Setup logging for API client"""
         logger = logging.getLogger('APIClient')
@@ -200,8 +239,8 @@ class APIClient:
             response = self.session.post(
                 f"{self.base_url}/auth/login",
                 json={
-                    'email': API_USERNAME,
-                    'password': API_PASSWORD
+                    'email': self.username,
+                    'password': self.password
                 },
                 timeout=10
             )
@@ -209,11 +248,7 @@ class APIClient:
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
-                    self.token = data.get('token')
-                    self.session.headers.update({
-                        'Authorization': f'Bearer {self.token}'
-                    })
-                    self.authenticated = True
+                    self.set_token(data.get('token'))
                     self.logger.info("✅ Successfully authenticated with API")
                     return True
                 else:
@@ -276,6 +311,76 @@ class APIClient:
             self.logger.error(f"❌ Error sending sensor data: {e}")
             return False
             
+    def send_sensor_data_bulk(self, readings):
+        """Send a batch of API-format readings (with timestamps) to the bulk endpoint"""
+        if not self.authenticated:
+            self.logger.warning("⚠️ Not authenticated, attempting to authenticate...")
+            if not self.authenticate():
+                return False
+                
+        try:
+            # Rate-limited batches are retried as they are, so a backfill keeps every row
+            for attempt in range(BULK_MAX_RETRIES + 1):
+                response = self.session.post(
+                    f"{self.base_url}/sensor/data/bulk",
+                    json={'readings': readings},
+                    timeout=60
+                )
+                if response.status_code != 429 or attempt == BULK_MAX_RETRIES:
+                    break
+                
+                delay = self.retry_delay(response, attempt)
+                self.logger.warning(f"⏳ Bulk ingest rate limited, retrying in {delay:.1f}s "
+                                    f"({attempt + 1}/{BULK_MAX_RETRIES})")
+                time.sleep(delay)
+            
+            if response.status_code == 201:
+                data = response.json()
+                if data.get('failed'):
+                    self.logger.warning(f"⚠️ {data['failed']} readings rejected by bulk ingest")
+                return True
+            else:
+                self.logger.error(f"❌ Failed to send bulk sensor data: HTTP {response.status_code} - {response.text}")
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"❌ Network error sending bulk sensor data: {e}")
+            return False
+            
+    def retry_delay(self, response, attempt):
+        """Seconds to wait after a 429: the server's reset hint, else exponential backoff"""
+        for header in ('RateLimit-Reset', 'Retry-After'):
+            try:
+                return min(max(float(response.headers[header]), 0.0), BULK_MAX_BACKOFF)
+            except (KeyError, ValueError):
+                continue
+        return min(2 ** attempt, BULK_MAX_BACKOFF)
+        
+    def bulk_create_users(self, users, issue_tokens=True):
+        """Provision users through the admin bulk endpoint (requires an admin session)"""
+        if not self.authenticated:
+            return None
+            
+        try:
+            response = self.session.post(
+                f"{self.base_url}/admin/users/bulk",
+                json={'users': users, 'issueTokens': issue_tokens},
+                timeout=120
+            )
+            
+            if response.status_code == 201:
+                data = response.json()
+                self.logger.info(f"👥 Provisioned users: {data.get('created')} created, "
+                                 f"{data.get('existing')} existing")
+                return data.get('data', [])
+            else:
+                self.logger.error(f"❌ Failed to provision users: HTTP {response.status_code} - {response.text}")
+                return None
+                
+        except Exception as e:
+            self.logger.error(f"❌ Error provisioning users: {e}")
+            return None
+            
     def get_machine_status(self, machine_id=None):
         """Get machine status from API"""
         if not self.authenticated:
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# scenarios.py
+"""
+Fault scenario engine
+Compiles declarative, multi-sensor fault scenarios into per-tick offset arrays
+and schedules them onto per-machine timelines ahead of time, so the simulator
+only does an array lookup per reading instead of drawing anomalies at random.
+
+A scenario is a duration (ticks) and a list of effects. Each effect moves one
+sensor by `delta` (in the sensor's units), starting `start` ticks into the
+scenario and ramping linearly over `ramp` ticks (0 = step change). The offset
+then holds until the scenario ends:
+
+    'bearing_wear': {
+        'duration': 720,
+        'effects': [
+            {'sensor': 'vibration', 'start': 0, 'ramp': 240, 'delta': 7.0},
+            {'sensor': 'heat', 'start': 120, 'ramp': 360, 'delta': 40.0},
+            ...
+        ]
+    }
+"""
+
+import json
+import random
+from array import array
+from bisect import bisect_right
+
+from config import *
+
+SCENARIO_LIBRARY = {
+    # Worn bearing: vibration first, friction heat follows, then the motor loses speed
+    'bearing_wear': {
+        'duration': 720,
+        'effects': [
+            {'sensor': 'vibration', 'start': 0, 'ramp': 240, 'delta': 7.0},
+            {'sensor': 'heat', 'start': 120, 'ramp': 360, 'delta': 40.0},
+            {'sensor': 'temperature', 'start': 180, 'ramp': 360, 'delta': 20.0},
+            {'sensor': 'motor_speed', 'start': 360, 'ramp': 240, 'delta': -700.0}
+        ]
+    },
+    # Blocked cooling: temperature and heat climb together, humidity drops
+    'cooling_failure': {
+        'duration': 360,
+        'effects': [
+            {'sensor': 'temperature', 'start': 0, 'ramp': 180, 'delta': 30.0},
+            {'sensor': 'heat', 'start': 30, 'ramp': 180, 'delta': 35.0},
+            {'sensor': 'humidity', 'start': 60, 'ramp': 120, 'delta': -20.0}
+        ]
+    },
+    # Supply sag: voltage drops abruptly, the motor slows and draws more heat
+    'voltage_sag': {
+        'duration': 90,
+        'effects': [
+            {'sensor': 'voltage', 'start': 0, 'ramp': 0, 'delta': -35.0},
+            {'sensor': 'motor_speed', 'start': 3, 'ramp': 10, 'delta': -400.0},
+            {'sensor': 'heat', 'start': 10, 'ramp': 40, 'delta': 15.0}
+        ]
+    },
+    # Seal leak: pressure bleeds off slowly
+    'pressure_leak': {
+        'duration': 480,
+        'effects': [
+            {'sensor': 'pressure', 'start': 0, 'ramp': 480, 'delta': -90.0}
+        ]
+    }
+}
+
+
+class Segment:
+    """A compiled stretch of a timeline: per-sensor offsets for ticks [start, end)"""
+
+    def __init__(self, start, end, offsets, onsets):
+        self.start = start
+        self.end = end
+        self.offsets = offsets  # sensor -> array('d') indexed by tick - start
+        self.onsets = onsets  # (tick - start, sensor) -> scenario name
+
+
+class CompiledScenario:
+    def __init__(self, name, spec):
+        duration = int(spec['duration'])
+        if duration <= 0:
+            raise ValueError(f"Scenario '{name}' needs a positive duration")
+
+        self.name = name
+        self.duration = duration
+        self.offsets = {}
+        self.onsets = {}
+
+        for effect in spec['effects']:
+            sensor = effect['sensor']
+            if sensor not in SENSOR_RANGES:
+                raise ValueError(f"Scenario '{name}' targets unknown sensor '{sensor}'")
+            start = int(effect.get('start', 0))
+            ramp = int(effect.get('ramp', 0))
+            delta = float(effect['delta'])
+            if not 0 <= start < duration:
+                raise ValueError(f"Scenario '{name}' starts a {sensor} effect outside its duration")
+
+            offsets = self.offsets.setdefault(sensor, array('d', bytes(8 * duration)))
+            for i in range(start, duration):
+                offsets[i] += delta * min(1.0, (i - start + 1) / ramp) if ramp else delta
+            self.onsets.setdefault((start, sensor), name)
+
+    def segment(self, start):
+        return Segment(start, start + self.duration, self.offsets, self.onsets)
+
+
+class Timeline:
+    """Non-overlapping segments of one machine, looked up by tick"""
+
+    def __init__(self, segments, schedule=None):
+        self.segments = segments
+        self.starts = [segment.start for segment in segments]
+        self.cursor = 0
+        self.last_tick = 0
+        self.schedule = schedule  # RandomSchedule that keeps faults coming past its horizon
+
+    def active(self, tick):
+        """Segment covering tick, or None; O(1) while ticks move forward"""
+        if self.schedule is not None and tick >= self.schedule.horizon:
+            self.extend(tick)
+
+        segments = self.segments
+        cursor = self.cursor
+        if tick < self.last_tick:
+            # Jumped backwards (e.g. a reset): find the segment again
+            cursor = max(0, bisect_right(self.starts, tick) - 1)
+        while cursor < len(segments) and segments[cursor].end <= tick:
+            cursor += 1
+        self.cursor = cursor
+        self.last_tick = tick
+
+        if cursor < len(segments) and segments[cursor].start <= tick:
+            return segments[cursor]
+        return None
+
+    def extend(self, tick):
+        """Schedule random faults past tick, dropping segments that have already ended"""
+        segments = [segment for segment in self.segments if segment.end > tick]
+        while tick >= self.schedule.horizon:
+            segments.extend(self.schedule.advance())
+        self.segments = merge_segments(segments)
+        self.starts = [segment.start for segment in self.segments]
+        self.cursor = 0
+
+
+def merge_segments(segments):
+    """Sum overlapping segments into composite ones so a timeline never overlaps"""
+    segments = sorted(segments, key=lambda segment: segment.start)
+    merged = []
+    for segment in segments:
+        if not merged or segment.start >= merged[-1].end:
+            merged.append(segment)
+            continue
+
+        previous = merged[-1]
+        start, end = previous.start, max(previous.end, segment.end)
+        offsets = {}
+        onsets = {}
+        for part in (previous, segment):
+            shift = part.start - start
+            for sensor, values in part.offsets.items():
+                combined = offsets.setdefault(sensor, array('d', bytes(8 * (end - start))))
+                for i, value in enumerate(values):
+                    combined[i + shift] += value
+            for (index, sensor), name in part.onsets.items():
+                onsets.setdefault((index + shift, sensor), name)
+        merged[-1] = Segment(start, end, offsets, onsets)
+
+    return merged
+
+
+def load_scenarios(path=SCENARIO_FILE):
+    """Scenario library extended with the definitions in a JSON file, if any"""
+    scenarios = dict(SCENARIO_LIBRARY)
+    if path:
+        with open(path) as f:
+            scenarios.update(json.load(f))
+    return scenarios
+
+
+class RandomSchedule:
+    """Independent faults of one machine with exponential gaps, drawn one horizon at a time"""
+
+    def __init__(self, scenarios, rng, horizon, mean_gap):
+        self.scenarios = scenarios
+        self.rng = rng
+        self.span = horizon
+        self.mean_gap = mean_gap
+        self.horizon = 0
+        self.next_tick = int(rng.expovariate(1 / mean_gap))
+
+    def advance(self):
+        """Segments starting before the next horizon, which becomes the current one"""
+        self.horizon += self.span
+        segments = []
+        while self.next_tick < self.horizon:
+            scenario = self.rng.choice(self.scenarios)
+            segments.append(scenario.segment(self.next_tick))
+            self.next_tick += scenario.duration + int(self.rng.expovariate(1 / self.mean_gap))
+        return segments
+
+
+class ScenarioEngine:
+    def __init__(self, names=None, definitions=None, seed=None):
+        definitions = definitions if definitions is not None else load_scenarios()
+        names = list(definitions) if not names or names == ['all'] else names
+        unknown = [name for name in names if name not in definitions]
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        self.seed = seed
+        self.scenarios = {name: CompiledScenario(name, definitions[name]) for name in names}
+        self.pending = {}  # machine id -> segments not yet compiled into a timeline
+        self.schedules = {}  # machine id -> RandomSchedule
+        self.timelines = {}
+
+    def schedule(self, name, machine_ids, start, stagger=0):
+        """Schedule one scenario on many machines, optionally staggered by up to `stagger` ticks"""
+        scenario = self.scenarios[name]
+        for machine_id in machine_ids:
+            rng = random.Random(f"{self.seed}:{name}:{start}:{machine_id}")
+            offset = rng.randint(0, stagger) if stagger else 0
+            self.pending.setdefault(machine_id, []).append(scenario.segment(start + offset))
+
+    def schedule_random(self, machine_ids, horizon=SCENARIO_HORIZON, mean_gap=SCENARIO_MEAN_GAP):
+        """Give every machine independent faults with exponential gaps, `horizon` ticks at a time"""
+        scenarios = list(self.scenarios.values())
+        for machine_id in machine_ids:
+            schedule = RandomSchedule(scenarios, random.Random(f"{self.seed}:{machine_id}"),
+                                      horizon, mean_gap)
+            self.pending.setdefault(machine_id, []).extend(schedule.advance())
+            self.schedules[machine_id] = schedule
+
+    def timeline(self, machine_id):
+        """Compiled timeline of a machine, or None if nothing is scheduled for it"""
+        segments = self.pending.pop(machine_id, [])
+        existing = self.timelines.get(machine_id)
+        schedule = self.schedules.get(machine_id)
+        if segments or (schedule is not None and existing is None):
+            self.timelines[machine_id] = Timeline(
+                merge_segments(segments + (existing.segments if existing else [])), schedule)
+        return self.timelines.get(machine_id)
+
+    def compile(self):
+        """Compile every pending schedule; returns machine id -> Timeline"""
+        for machine_id in list(self.pending) + list(self.schedules):
+            self.timeline(machine_id)
+        return self.timelines
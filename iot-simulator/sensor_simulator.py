@@ -5,6 +5,7 @@ Enhanced IoT Sensor Simulator
 Simulates realistic industrial sensor data with trends, anomalies, and machine states
 """
 
+import os
 import time
 import random
 import json
@@ -15,26 +16,57 @@ import logging
 from datetime import datetime, timedelta
 from config import *
 from mqtt_client import MQTTClient, APIClient
+from scenarios import ScenarioEngine
+
+# The profiler is shared with the ml-service
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml-service'))
+from services.profiler import profiler  # noqa: E402
 
 class SensorSimulator:
-    def __init__(self):
+    def __init__(self, machine_ids=None, seed=None, use_mqtt=USE_MQTT, use_api=USE_API,
+                 label_sink=None, clock=datetime.now, scenarios=SCENARIOS):
         self.mqtt_client = None
         self.api_client = None
         self.running = False
         self.machine_states = {}
+        self.machine_ids = machine_ids or MACHINE_IDS[:MAX_MACHINES]
+        self.use_mqtt = use_mqtt
+        self.use_api = use_api
+        self.anomaly_probability = ANOMALY_PROBABILITY
+        
+        # Seeded generator so that workloads are reproducible
+        self.rng = random.Random(seed)
+        
+        # Wall clock by default; backfill passes a virtual clock
+        self.clock = clock
+        
+        # Simulation tick and ground-truth anomaly label side-channel
+        self.tick = 0
+        self.label_sink = label_sink
         
         # Setup logging
         self.setup_logging()
         
+        if self.label_sink is None and ANOMALY_LABELS_FILE:
+            self.label_sink = self.write_label_to_file
+        
         # Initialize clients based on configuration
         self.setup_clients()
         
         # Initialize machine states
         self.initialize_machine_states()
         
+        # Compiled fault timelines replace random anomalies; scenarios are either names
+        # to schedule at random (an empty list disables them) or a prepared engine
+        if scenarios and not isinstance(scenarios, ScenarioEngine):
+            scenarios = ScenarioEngine(scenarios, seed=seed)
+            scenarios.schedule_random(self.machine_ids)
+        self.scenario_timelines = scenarios.compile() if scenarios else None
+        
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        profiler.install_signal_handler()
     
     def setup_logging(self):
         """Setup logging configuration"""
@@ -50,15 +82,15 @@ class SensorSimulator:
         
     def setup_clients(self):
         """Initialize MQTT and API clients based on configuration"""
-        if USE_MQTT:
+        if self.use_mqtt:
             self.logger.info("🔄 Initializing MQTT client...")
             self.mqtt_client = MQTTClient()
             
-        if USE_API:
+        if self.use_api:
             self.logger.info("🔄 Initializing API client...")
             self.api_client = APIClient()
             
-        if not USE_MQTT and not USE_API:
+        if not self.use_mqtt and not self.use_api:
             self.logger.warning("⚠️ No communication method enabled! Enable MQTT or API in config.")
     
     def signal_handler(self, signum, frame):
@@ -69,32 +101,42 @@ class SensorSimulator:
     
     def initialize_machine_states(self):
         """Initialize realistic machine states"""
-        for i, machine_id in enumerate(MACHINE_IDS[:MAX_MACHINES]):
+        for i, machine_id in enumerate(self.machine_ids):
             # Create realistic baseline values for each machine
-            base_temp = random.uniform(45, 65)  # Different baseline temperatures
-            base_voltage = random.uniform(215, 235)  # Slightly different voltage levels
+            base_temp = self.rng.uniform(45, 65)  # Different baseline temperatures
+            base_voltage = self.rng.uniform(215, 235)  # Slightly different voltage levels
             
             self.machine_states[machine_id] = {
                 'temperature': base_temp,
-                'pressure': random.uniform(980, 1020),
-                'vibration': random.uniform(1, 3),
-                'humidity': random.uniform(45, 65),
-                'motor_speed': random.uniform(1800, 2200),
+                'pressure': self.rng.uniform(980, 1020),
+                'vibration': self.rng.uniform(1, 3),
+                'humidity': self.rng.uniform(45, 65),
+                'motor_speed': self.rng.uniform(1800, 2200),
                 'voltage': base_voltage,
-                'heat': random.uniform(80, 120),
-                'working_period': random.uniform(6, 10),
+                'heat': self.rng.uniform(80, 120),
+                'working_period': self.rng.uniform(6, 10),
                 'working_status': True,
-                'last_maintenance': datetime.now() - timedelta(days=random.randint(1, 90)),
+                'last_maintenance': self.clock() - timedelta(days=self.rng.randint(1, 90)),
                 'anomaly_trend': 0,  # Tracks anomaly development
-                'degradation_factor': random.uniform(0.98, 1.02)  # Simulates machine wear
+                'degradation_factor': self.rng.uniform(0.98, 1.02)  # Simulates machine wear
+            }
+            self.machine_states[machine_id]['baseline'] = {
+                sensor: self.machine_states[machine_id][sensor] for sensor in SENSOR_RANGES
             }
             
         self.logger.info(f"🏭 Initialized {len(self.machine_states)} machine states")
     
+    def perform_maintenance(self, machine_id):
+        """Service a machine: reset wear, anomaly trend and sensor values to baseline"""
+        machine = self.machine_states[machine_id]
+        machine.update(machine['baseline'])
+        machine['last_maintenance'] = self.clock()
+        machine['anomaly_trend'] = 0
+    
     def generate_sensor_data(self, sensor_type):
         """Generate random sensor data based on type (legacy method)"""
         sensor_config = SENSOR_RANGES.get(sensor_type, SENSOR_RANGES['temperature'])
-        return round(random.uniform(sensor_config['min'], sensor_config['max']), 2)
+        return round(self.rng.uniform(sensor_config['min'], sensor_config['max']), 2)
     
     def generate_realistic_value(self, machine_id, sensor_type):
         """Generate realistic sensor values with trends and machine-specific characteristics"""
@@ -106,28 +148,30 @@ class SensorSimulator:
         
         # Get current value or initialize with random baseline
         current_value = machine.get(sensor_type, 
-                                  random.uniform(sensor_config.get('min', 0), 
+                                  self.rng.uniform(sensor_config.get('min', 0), 
                                                sensor_config.get('max', 100)))
         
-        # Calculate time-based degradation
-        days_since_maintenance = (datetime.now() - machine['last_maintenance']).days
-        degradation_factor = 1 + (days_since_maintenance * 0.001)  # Gradual increase over time
+        # Wear raises temperature, heat and vibration linearly with the time since
+        # maintenance, as an offset from the machine's baseline rather than per tick
+        baseline = machine.get('baseline', {}).get(sensor_type, current_value)
+        expected = baseline
+        if sensor_type in ['temperature', 'heat', 'vibration']:
+            days_since_maintenance = (self.clock() - machine['last_maintenance']) / timedelta(days=1)
+            expected += baseline * days_since_maintenance * 0.001  # 0.1% of baseline per day
         
         # Add realistic drift and noise
-        drift = random.uniform(-0.02, 0.02) * current_value  # 2% drift
-        noise = random.uniform(-sensor_config.get('noise', 1), 
+        drift = self.rng.uniform(-0.02, 0.02) * expected  # 2% drift
+        noise = self.rng.uniform(-sensor_config.get('noise', 1), 
                               sensor_config.get('noise', 1))
         
-        # Calculate new value
-        new_value = current_value + drift + noise
-        
-        # Apply degradation for certain sensors
-        if sensor_type in ['temperature', 'heat', 'vibration']:
-            new_value *= degradation_factor
+        # Calculate new value, pulled back towards the expected one so drift and past
+        # anomalies settle instead of random-walking to the range limits
+        new_value = current_value + (expected - current_value) * 0.1 + drift + noise
             
-        # Handle anomalies
-        if ENABLE_ANOMALIES and random.random() < ANOMALY_PROBABILITY:
-            new_value = self.generate_anomaly(sensor_type, new_value, machine)
+        # Handle anomalies (drawn at random unless scenario timelines are compiled)
+        timelines = self.scenario_timelines
+        if timelines is None and ENABLE_ANOMALIES and self.rng.random() < self.anomaly_probability:
+            new_value = self.generate_anomaly(sensor_type, new_value, machine, machine_id)
             
         # Ensure value stays within bounds
         new_value = max(sensor_config.get('min', 0), 
@@ -136,21 +180,44 @@ class SensorSimulator:
         # Update machine state
         machine[sensor_type] = new_value
         
+        # Scenario offsets shape the reading without feeding back into the state
+        if timelines:
+            timeline = timelines.get(machine_id)
+            segment = timeline.active(self.tick) if timeline else None
+            if segment is not None:
+                new_value = self.apply_scenario(segment, machine_id, sensor_type, new_value)
+        
         return round(new_value, 2)
     
-    def generate_anomaly(self, sensor_type, normal_value, machine):
-        """Generate anomalous values"""
+    def apply_scenario(self, segment, machine_id, sensor_type, value):
+        """Offset a reading by the active scenario segment and label effect onsets"""
+        offsets = segment.offsets.get(sensor_type)
+        if offsets is None:
+            return value
+            
+        index = self.tick - segment.start
+        sensor_config = SENSOR_RANGES.get(sensor_type, {})
+        value = max(sensor_config.get('min', 0), 
+                    min(sensor_config.get('max', 100), value + offsets[index]))
+        
+        scenario = segment.onsets.get((index, sensor_type))
+        if scenario:
+            self.emit_label(machine_id, sensor_type, scenario, value, until_tick=segment.end)
+        return value
+    
+    def generate_anomaly(self, sensor_type, normal_value, machine, machine_id=None):
+        """Generate anomalous values and emit a ground-truth label for them"""
         sensor_config = SENSOR_RANGES.get(sensor_type, {})
         
         # Increase anomaly trend
         machine['anomaly_trend'] = min(1.0, machine['anomaly_trend'] + 0.1)
         
         # Generate different types of anomalies
-        anomaly_type = random.choice(['spike', 'drift', 'critical'])
+        anomaly_type = self.rng.choice(['spike', 'drift', 'critical'])
         
         if anomaly_type == 'spike':
             # Sudden spike in value
-            multiplier = random.uniform(1.2, 1.8)
+            multiplier = self.rng.uniform(1.2, 1.8)
             anomaly_value = normal_value * multiplier
         elif anomaly_type == 'drift':
             # Gradual drift towards critical values
@@ -158,18 +225,41 @@ class SensorSimulator:
             anomaly_value = normal_value + (critical_value - normal_value) * 0.3
         else:  # critical
             # Critical value that should trigger alerts
-            anomaly_value = random.uniform(
+            anomaly_value = self.rng.uniform(
                 sensor_config.get('normal_max', 80),
                 sensor_config.get('max', 100)
             )
             
         self.logger.warning(f"⚠️ Anomaly generated for {sensor_type}: {anomaly_value:.2f}")
+        self.emit_label(machine_id, sensor_type, anomaly_type, anomaly_value)
         return anomaly_value
     
+    def emit_label(self, machine_id, sensor_type, anomaly_type, value, until_tick=None):
+        """Publish a ground-truth anomaly label; scenario labels carry the tick their fault ends"""
+        if self.label_sink is None:
+            return
+            
+        label = {
+            'tick': self.tick,
+            'timestamp': self.clock().isoformat(),
+            'machine_id': machine_id,
+            'sensor_type': sensor_type,
+            'anomaly_type': anomaly_type,
+            'value': round(value, 2)
+        }
+        if until_tick is not None:
+            label['until_tick'] = until_tick
+        self.label_sink(label)
+    
+    def write_label_to_file(self, label):
+        """Append a ground-truth label to ANOMALY_LABELS_FILE as a JSON line"""
+        with open(ANOMALY_LABELS_FILE, 'a') as f:
+            f.write(json.dumps(label) + '\n')
+    
     def add_sensor_noise(self, value, sensor_type):
         """Add realistic noise to sensor readings"""
         sensor_config = SENSOR_RANGES.get(sensor_type, {'noise': 0.5})
-        noise = random.uniform(-sensor_config['noise'], sensor_config['noise'])
+        noise = self.rng.uniform(-sensor_config['noise'], sensor_config['noise'])
         return round(value + noise, 2)
     
     def simulate_sensor_drift(self, base_value, sensor_type):
@@ -184,7 +274,7 @@ class SensorSimulator:
             "heat": 0.02
         }
         
-        drift = random.uniform(-drift_rates.get(sensor_type, 0.01), 
+        drift = self.rng.uniform(-drift_rates.get(sensor_type, 0.01), 
                               drift_rates.get(sensor_type, 0.01))
         return base_value + drift
     
@@ -195,7 +285,7 @@ class SensorSimulator:
         return {
             "sensor_type": sensor_type,
             "value": value,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock().isoformat(),
             "machine_id": machine_id,
             "unit": sensor_config.get('unit', ''),
             "status": self.get_sensor_status(sensor_type, value),
@@ -216,14 +306,14 @@ class SensorSimulator:
         
         # Determine working status based on sensor values and random factors
         working_status = machine.get('working_status', True)
-        if random.random() < 0.02:  # 2% chance of status change
+        if self.rng.random() < 0.02:  # 2% chance of status change
             working_status = not working_status
             machine['working_status'] = working_status
             
         # If machine is not working, adjust some values
         if not working_status:
             motor_speed = 0
-            voltage = random.uniform(0, 50)  # Standby voltage
+            voltage = self.rng.uniform(0, 50)  # Standby voltage
             working_period = 0
             heat = temperature  # Heat equals ambient temperature when off
             
@@ -235,7 +325,7 @@ class SensorSimulator:
             'heat': heat,
             'working_status': working_status,
             'working_period': working_period,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock().isoformat(),
             'additional_sensors': {
                 'pressure': self.generate_realistic_value(machine_id, 'pressure'),
                 'vibration': self.generate_realistic_value(machine_id, 'vibration'),
@@ -262,7 +352,7 @@ class SensorSimulator:
     
     def get_data_quality(self):
         """Simulate data quality metrics"""
-        return random.choice(["good", "good", "good", "fair", "excellent"])
+        return self.rng.choice(["good", "good", "good", "fair", "excellent"])
     
     def is_value_normal(self, sensor_type, value):
         """Check if sensor value is within normal range (legacy method)"""
@@ -288,19 +378,48 @@ class SensorSimulator:
         else:
             self.logger.info(f"{status_icon} {machine_id} | OFFLINE")
     
+    def step(self):
+        """Generate one payload per machine and advance the simulation tick"""
+        payloads = [self.create_industrial_payload(machine_id) 
+                    for machine_id in self.machine_states]
+        self.tick += 1
+        return payloads
+    
+    def publish_payload(self, payload, mqtt_client=None, api_client=None):
+        """Send a payload through every enabled communication method"""
+        mqtt_client = mqtt_client or self.mqtt_client
+        api_client = api_client or self.api_client
+        sent = False
+        
+        if mqtt_client and mqtt_client.connected:
+            sent = mqtt_client.publish(MQTT_TOPIC, json.dumps(payload)) or sent
+            
+        if api_client:
+            sent = api_client.send_sensor_data(payload) or sent
+            
+        return sent
+    
+    def publish_tick(self, payloads):
+        """Publish every payload generated in one tick"""
+        for payload in payloads:
+            self.publish_payload(payload)
+            self.log_machine_status(payload['machine_id'], payload)
+    
     def simulate(self):
         """Main simulation loop"""
         self.running = True
         self.logger.info("🚀 Starting IoT sensor simulation...")
-        self.logger.info(f"📊 Simulating {MAX_MACHINES} machines")
+        self.logger.info(f"📊 Simulating {len(self.machine_states)} machines")
         self.logger.info(f"⏱️ Update interval: {SIMULATION_INTERVAL} seconds")
-        self.logger.info(f"📡 MQTT enabled: {USE_MQTT}")
-        self.logger.info(f"🌐 API enabled: {USE_API}")
+        self.logger.info(f"📡 MQTT enabled: {self.use_mqtt}")
+        self.logger.info(f"🌐 API enabled: {self.use_api}")
         self.logger.info(f"⚠️ Anomalies enabled: {ENABLE_ANOMALIES}")
+        if self.scenario_timelines is not None:
+            self.logger.info(f"🧩 Fault scenarios scheduled on {len(self.scenario_timelines)} machines")
         self.logger.info("-" * 60)
         
         # Wait for connections if using MQTT
-        if USE_MQTT and self.mqtt_client:
+        if self.use_mqtt and self.mqtt_client:
             retry_count = 0
             while not self.mqtt_client.connected and retry_count < 10:
                 self.logger.info("⏳ Waiting for MQTT connection...")
@@ -309,12 +428,12 @@ class SensorSimulator:
             
             if not self.mqtt_client.connected:
                 self.logger.error("❌ Failed to connect to MQTT broker")
-                if not USE_API:
+                if not self.use_api:
                     self.logger.error("❌ No communication method available. Exiting.")
                     return
         
         # Check API health if using API
-        if USE_API and self.api_client:
+        if self.use_api and self.api_client:
             if not self.api_client.health_check():
                 self.logger.warning("⚠️ API health check failed")
             
@@ -323,9 +442,32 @@ class SensorSimulator:
         
         try:
             while self.running:
-                # Simulation loop body - to be implemented
-                pass
+                self.publish_tick(self.step())
+                    
+                iteration_count += 1
+                if time.time() - last_status_report >= 60:
+                    self.logger.info(f"📈 Completed {iteration_count} iterations")
+                    last_status_report = time.time()
+                    
+                time.sleep(SIMULATION_INTERVAL)
         except Exception as e:
             self.logger.error(f"Error in simulation: {e}")
         finally:
-            self.logger.info("Simulation stopped")
\ No newline at end of file
+            self.logger.info("Simulation stopped")
+    
+    def stop(self):
+        """Stop the simulation loop and release client connections"""
+        self.running = False
+        if self.mqtt_client:
+            self.mqtt_client.disconnect()
+
+
+# Runtime profiling defaults and the stages it can be scoped to
+profiler.configure(PROFILE_DIR, PROFILE_MODE, PROFILE_DURATION, PROFILE_STAGES, PROFILE_MAX_DURATION)
+profiler.register_stage('generate', SensorSimulator, 'generate_realistic_value')
+profiler.register_stage('api_send', APIClient, 'send_sensor_data')
+profiler.register_stage('mqtt_publish', MQTTClient, 'publish')
+
+
+if __name__ == "__main__":
+    SensorSimulator().simulate()
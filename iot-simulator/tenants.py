@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# tenants.py
+"""
+Multi-tenant IoT Sensor Simulator
+Shards the simulated fleet across many tenant accounts, each with its own
+token, pooled HTTP session and MQTT client id, and reports throughput and
+latency per tenant
+"""
+
+import time
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import *
+from mqtt_client import MQTTClient, APIClient
+from sensor_simulator import SensorSimulator
+
+
+class TenantStats:
+    def __init__(self, max_samples=10000):
+        self.sent = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=max_samples)
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, ok, latency):
+        with self.lock:
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.latencies.append(latency)
+
+    def summary(self):
+        """Throughput (messages/s) and latency percentiles (ms) since start"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            sent, failed = self.sent, self.failed
+        elapsed = max(time.time() - self.started, 1e-9)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            'sent': sent,
+            'failed': failed,
+            'throughput': sent / elapsed,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0
+        }
+
+
+class Tenant:
+    def __init__(self, index, email):
+        self.index = index
+        self.email = email
+        self.machine_ids = []
+        self.api_client = None
+        self.mqtt_client = None
+        self.stats = TenantStats()
+
+
+class MultiTenantSimulator(SensorSimulator):
+    def __init__(self, tenant_count=TENANT_COUNT, **kwargs):
+        if tenant_count < 1:
+            raise ValueError("Multi-tenant mode needs at least one tenant")
+        self.tenant_count = tenant_count
+        self.tenants = []
+        self.machine_tenants = {}
+        self.executor = None
+        self.last_report = time.time()
+        super().__init__(**kwargs)
+
+    def setup_clients(self):
+        """Provision tenant accounts and give each its own clients and machine shard"""
+        self.tenants = [
+            Tenant(n, TENANT_EMAIL_TEMPLATE.format(n=n))
+            for n in range(1, self.tenant_count + 1)
+        ]
+        tokens = self.provision_tenants() if self.use_api else {}
+
+        for tenant in self.tenants:
+            if self.use_api:
+                tenant.api_client = APIClient(
+                    username=tenant.email,
+                    password=TENANT_PASSWORD,
+                    token=tokens.get(tenant.email),
+                    pool_size=TENANT_POOL_SIZE
+                )
+            if self.use_mqtt:
+                tenant.mqtt_client = MQTTClient(client_id=f"{MQTT_CLIENT_ID}-{tenant.index:03d}")
+
+        for i, machine_id in enumerate(self.machine_ids):
+            tenant = self.tenants[i % len(self.tenants)]
+            tenant.machine_ids.append(machine_id)
+            self.machine_tenants[machine_id] = tenant
+
+        idle = sum(1 for tenant in self.tenants if not tenant.machine_ids)
+        if idle:
+            self.logger.warning(f"⚠️ {idle} tenants have no machines; raise MAX_MACHINES to cover them")
+
+        self.executor = ThreadPoolExecutor(max_workers=TENANT_WORKERS)
+        self.logger.info(f"👥 {len(self.tenants)} tenants sharing {len(self.machine_ids)} machines")
+
+    def provision_tenants(self):
+        """Create all tenant accounts in bulk; returns email -> token"""
+        admin = APIClient(username=ADMIN_USERNAME, password=ADMIN_PASSWORD)
+        if not admin.authenticated:
+            self.logger.error("❌ Admin login failed, tenants will log in individually")
+            return {}
+
+        tokens = {}
+        batch_size = 500
+        for start in range(0, len(self.tenants), batch_size):
+            users = [{
+                'firstName': 'Tenant',
+                'lastName': f"{tenant.index:03d}",
+                'email': tenant.email,
+                'password': TENANT_PASSWORD
+            } for tenant in self.tenants[start:start + batch_size]]
+
+            provisioned = admin.bulk_create_users(users) or []
+            tokens.update({user['email']: user.get('token') for user in provisioned})
+
+        return tokens
+
+    def publish_tick(self, payloads):
+        """Fan the tick out to one sender task per tenant"""
+        by_tenant = defaultdict(list)
+        for payload in payloads:
+            by_tenant[self.machine_tenants[payload['machine_id']]].append(payload)
+
+        wait([
+            self.executor.submit(self.publish_tenant_payloads, tenant, tenant_payloads)
+            for tenant, tenant_payloads in by_tenant.items()
+        ])
+
+        if time.time() - self.last_report >= TENANT_REPORT_INTERVAL:
+            self.report()
+            self.last_report = time.time()
+
+    def publish_tenant_payloads(self, tenant, payloads):
+        for payload in payloads:
+            start = time.perf_counter()
+            ok = self.publish_payload(payload, tenant.mqtt_client, tenant.api_client)
+            tenant.stats.record(ok, time.perf_counter() - start)
+
+    def report(self):
+        """Log throughput and latency for every tenant and the fleet total"""
+        total_sent = total_failed = total_throughput = 0
+        self.logger.info(f"{'tenant':<28}{'sent':>8}{'failed':>8}{'msg/s':>9}"
+                         f"{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for tenant in self.tenants:
+            summary = tenant.stats.summary()
+            total_sent += summary['sent']
+            total_failed += summary['failed']
+            total_throughput += summary['throughput']
+            self.logger.info(
+                f"{tenant.email:<28}{summary['sent']:>8}{summary['failed']:>8}"
+                f"{summary['throughput']:>9.2f}{summary['p50_ms']:>9.1f}"
+                f"{summary['p95_ms']:>9.1f}{summary['max_ms']:>9.1f}"
+            )
+        self.logger.info(f"📈 Total: {total_sent} sent, {total_failed} failed, "
+                         f"{total_throughput:.2f} msg/s")
+
+    def stop(self):
+        """Stop the simulation, release tenant clients and print the final report"""
+        super().stop()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+        for tenant in self.tenants:
+            if tenant.mqtt_client:
+                tenant.mqtt_client.disconnect()
+        self.report()
+
+
+if __name__ == "__main__":
+    MultiTenantSimulator().simulate()
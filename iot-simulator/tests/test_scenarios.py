@@ -0,0 +1,148 @@
+# test_scenarios.py
+"""
+Scenario compilation, segment merging, timeline lookup and extension, and the
+ground-truth labels the simulator emits for scheduled faults
+"""
+import pytest
+
+import sensor_simulator
+from scenarios import SCENARIO_LIBRARY, CompiledScenario, ScenarioEngine, Segment, Timeline, merge_segments
+
+
+def ramp_scenario(duration=10, effects=None):
+    return {'duration': duration, 'effects': effects or [
+        {'sensor': 'temperature', 'start': 2, 'ramp': 4, 'delta': 8.0},
+        {'sensor': 'voltage', 'start': 0, 'ramp': 0, 'delta': -5.0},
+    ]}
+
+
+def starts(engine, machine_id, ticks):
+    timeline = engine.compile()[machine_id]
+    seen = []
+    for tick in range(ticks):
+        segment = timeline.active(tick)
+        if segment is not None and (not seen or seen[-1] != segment.start):
+            seen.append(segment.start)
+    return seen
+
+
+def test_compile_ramps_then_holds_each_effect():
+    scenario = CompiledScenario('ramp', ramp_scenario())
+
+    assert list(scenario.offsets['temperature']) == [0, 0, 2, 4, 6, 8, 8, 8, 8, 8]
+    assert list(scenario.offsets['voltage']) == [-5.0] * 10
+    assert scenario.onsets == {(2, 'temperature'): 'ramp', (0, 'voltage'): 'ramp'}
+
+
+def test_compile_sums_effects_on_the_same_sensor():
+    scenario = CompiledScenario('double', ramp_scenario(4, [
+        {'sensor': 'heat', 'start': 0, 'ramp': 0, 'delta': 1.0},
+        {'sensor': 'heat', 'start': 2, 'ramp': 0, 'delta': 2.0},
+    ]))
+
+    assert list(scenario.offsets['heat']) == [1, 1, 3, 3]
+
+
+@pytest.mark.parametrize('spec', [
+    ramp_scenario(0),
+    ramp_scenario(effects=[{'sensor': 'flux', 'delta': 1.0}]),
+    ramp_scenario(effects=[{'sensor': 'heat', 'start': 10, 'delta': 1.0}]),
+])
+def test_compile_rejects_invalid_scenarios(spec):
+    with pytest.raises(ValueError):
+        CompiledScenario('bad', spec)
+
+
+def test_engine_rejects_unknown_names_and_accepts_all():
+    with pytest.raises(ValueError, match='nope'):
+        ScenarioEngine(['nope'], definitions=SCENARIO_LIBRARY)
+
+    assert set(ScenarioEngine(['all'], definitions=SCENARIO_LIBRARY).scenarios) == set(SCENARIO_LIBRARY)
+
+
+def test_merge_sums_overlapping_segments_and_shifts_onsets():
+    scenario = CompiledScenario('ramp', ramp_scenario())
+    separate = scenario.segment(100)
+
+    merged = merge_segments([scenario.segment(5), separate, scenario.segment(0)])
+
+    assert [(segment.start, segment.end) for segment in merged] == [(0, 15), (100, 110)]
+    assert merged[1] is separate
+    composite = merged[0]
+    assert list(composite.offsets['voltage']) == [-5] * 5 + [-10] * 5 + [-5] * 5
+    assert list(composite.offsets['temperature']) == [0, 0, 2, 4, 6, 8, 8, 10, 12, 14, 8, 8, 8, 8, 8]
+    assert composite.onsets == {
+        (0, 'voltage'): 'ramp', (2, 'temperature'): 'ramp',
+        (5, 'voltage'): 'ramp', (7, 'temperature'): 'ramp',
+    }
+
+
+def test_timeline_finds_segments_forwards_and_after_jumping_back():
+    first, second = Segment(10, 20, {}, {}), Segment(30, 40, {}, {})
+    timeline = Timeline([first, second])
+
+    assert [timeline.active(tick) for tick in (0, 10, 19, 20, 35, 40)] == [None, first, first, None, second, None]
+    assert timeline.active(12) is first
+    assert timeline.active(5) is None
+    assert timeline.active(30) is second
+
+
+def test_scheduled_scenarios_are_staggered_deterministically():
+    def schedule(seed):
+        engine = ScenarioEngine(['voltage_sag'], definitions=SCENARIO_LIBRARY, seed=seed)
+        engine.schedule('voltage_sag', ['M1', 'M2', 'M3'], start=50, stagger=20)
+        return {machine_id: timeline.segments[0].start for machine_id, timeline in engine.compile().items()}
+
+    placed = schedule(7)
+    assert placed == schedule(7)
+    assert all(50 <= start <= 70 for start in placed.values())
+
+
+def test_random_faults_keep_coming_past_the_first_horizon():
+    engine = ScenarioEngine(definitions=SCENARIO_LIBRARY, seed=1)
+    engine.schedule_random(['M1'], horizon=1000, mean_gap=200)
+
+    seen = starts(engine, 'M1', 20000)
+
+    assert seen[-1] > 15000
+    assert len(seen) > 10
+
+
+def test_horizon_chunking_does_not_change_the_schedule():
+    def schedule(horizon):
+        engine = ScenarioEngine(definitions=SCENARIO_LIBRARY, seed=3)
+        engine.schedule_random(['M1'], horizon=horizon, mean_gap=150)
+        return starts(engine, 'M1', 10000)
+
+    assert schedule(500) == schedule(10000)
+
+
+def test_extend_keeps_fixed_schedules_and_drops_ended_segments():
+    engine = ScenarioEngine(['voltage_sag'], definitions=SCENARIO_LIBRARY, seed=2)
+    engine.schedule_random(['M1'], horizon=100, mean_gap=1000000)
+    engine.schedule('voltage_sag', ['M1'], start=150)
+    engine.schedule('voltage_sag', ['M1'], start=5000)
+    timeline = engine.compile()['M1']
+
+    assert timeline.active(160).start == 150
+    assert timeline.active(5010).start == 5000
+    assert all(segment.end > 5010 for segment in timeline.segments)
+
+
+def test_scenario_labels_carry_the_tick_their_fault_ends(tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_simulator, 'LOG_FILE', str(tmp_path / 'simulator.log'))
+    engine = ScenarioEngine(['voltage_sag'], definitions=SCENARIO_LIBRARY, seed=0)
+    engine.schedule('voltage_sag', ['M1'], start=3)
+    labels = []
+    simulator = sensor_simulator.SensorSimulator(machine_ids=['M1'], seed=0, use_mqtt=False, use_api=False,
+                                                 label_sink=labels.append, scenarios=engine)
+
+    for _ in range(100):
+        simulator.step()
+
+    assert [(label['tick'], label['sensor_type'], label['anomaly_type'], label['until_tick'])
+            for label in labels] == [
+        (3, 'voltage', 'voltage_sag', 93),
+        (6, 'motor_speed', 'voltage_sag', 93),
+        (13, 'heat', 'voltage_sag', 93),
+    ]
@@ -0,0 +1,72 @@
+# admin_api.py
+"""
+Admin endpoints
+Runtime profiling control. Disabled (403) unless ML_ADMIN_TOKEN is set;
+requests must then send it in the X-Admin-Token header. With several workers, start and stop requests are
+broadcast to every worker through the supervisor (services/worker_relay.py).
+"""
+import os
+import secrets
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from config import ADMIN_TOKEN, PROFILE_DURATION, PROFILE_MAX_DURATION, PROFILE_MODE
+from services.profiler import PROFILE_MODES, profiler
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ML_ADMIN_TOKEN")
+    if not secrets.compare_digest(x_admin_token or '', ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+class ProfileRequest(BaseModel):
+    mode: str = PROFILE_MODE
+    duration: float = Field(default=PROFILE_DURATION, gt=0, le=PROFILE_MAX_DURATION)
+    stages: List[str] = []
+    memory: bool = False
+
+
+@router.get("/profile")
+def profile_status():
+    return {"success": True, "data": {**profiler.status(), "pid": os.getpid()}}
+
+
+@router.post("/profile", status_code=202)
+def start_profile(request: ProfileRequest, http_request: Request):
+    profile_control = getattr(http_request.app.state, 'profile_control', None)
+    if profile_control is not None:
+        # Validate here; the workers apply the request asynchronously
+        if request.mode not in PROFILE_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown profile mode '{request.mode}'")
+        unknown = [stage for stage in request.stages if stage not in profiler.stages]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown profile stages: {', '.join(unknown)}")
+        workers = profile_control.request('start', {
+            'mode': request.mode, 'duration': request.duration,
+            'stages': request.stages, 'memory': request.memory
+        })
+        return {"success": True, "data": {"broadcast": True, "workers": workers}}
+
+    try:
+        status = profiler.start(request.mode, request.duration, request.stages, request.memory)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "data": status}
+
+
+@router.delete("/profile")
+def stop_profile(http_request: Request):
+    profile_control = getattr(http_request.app.state, 'profile_control', None)
+    if profile_control is not None:
+        workers = profile_control.request('stop')
+        return {"success": True, "data": {"broadcast": True, "workers": workers}}
+    return {"success": True, "data": {"artifacts": profiler.stop()}}
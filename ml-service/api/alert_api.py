@@ -0,0 +1,42 @@
+# alert_api.py
+"""
+Alert ingestion endpoints
+The Node backend posts threshold alerts here; they are queued for the
+aggregation stage and the request returns immediately.
+"""
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+from services.alert_aggregator import alert_aggregator
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+
+# Mirrors the MaintenanceAlert schema enums in server/src/models/MaintenanceAlert.js
+AlertType = Literal['temperature', 'voltage', 'vibration', 'wear', 'failure_prediction', 'maintenance_due']
+Severity = Literal['low', 'medium', 'high', 'critical']
+
+
+class AlertIn(BaseModel):
+    userId: str
+    machineId: str
+    alertType: AlertType
+    severity: Severity
+    message: str
+    confidence: Optional[float] = None
+    predictedFailureDate: Optional[datetime] = None
+
+
+# Plain defs: with several workers these make a round trip to the supervisor
+@router.post("", status_code=202)
+def submit_alerts(alerts: List[AlertIn]):
+    accepted = alert_aggregator.submit_many([alert.model_dump() for alert in alerts])
+    return {"success": True, "accepted": accepted, "dropped": len(alerts) - accepted}
+
+
+@router.get("/stats")
+def alert_stats():
+    return {"success": True, **alert_aggregator.status()}
@@ -0,0 +1,40 @@
+# fleet_api.py
+"""
+Fleet state endpoints
+Read the shared-memory per-machine state written by the fleet writer
+"""
+from fastapi import APIRouter, HTTPException
+
+from services.prediction_service import prediction_service
+
+router = APIRouter(prefix="/fleet", tags=["fleet"])
+
+
+def get_fleet_state():
+    if prediction_service.fleet_state is None:
+        raise HTTPException(status_code=503, detail="Fleet state is disabled")
+    return prediction_service.fleet_state
+
+
+@router.get("")
+def list_machines():
+    fleet_state = get_fleet_state()
+    machine_ids = fleet_state.machine_ids()
+    return {
+        "success": True,
+        "count": len(machine_ids),
+        "capacity": fleet_state.max_machines,
+        "writer": dict(prediction_service.fleet_writer.stats),
+        "data": machine_ids
+    }
+
+
+@router.get("/{machine_id}")
+def machine_state(machine_id: str):
+    try:
+        state = get_fleet_state().read(machine_id)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No state for machine {machine_id}")
+    return {"success": True, "data": state}
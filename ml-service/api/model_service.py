@@ -0,0 +1,28 @@
+# model_service.py
+"""
+Model management endpoints
+"""
+from fastapi import APIRouter
+
+from services.prediction_service import prediction_service
+
+router = APIRouter(prefix="/models", tags=["models"])
+
+
+@router.get("")
+def list_models():
+    return {
+        "success": True,
+        "data": [
+            {"name": name, "type": type(detector).__name__,
+             "parameters": {key: value for key, value in vars(detector).items()
+                            if isinstance(value, (int, float))}}
+            for name, detector in prediction_service.detectors.items()
+        ]
+    }
+
+
+@router.post("/reset")
+def reset_models():
+    prediction_service.reset()
+    return {"success": True, "message": "Detector state reset"}
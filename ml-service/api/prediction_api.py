@@ -0,0 +1,40 @@
+# prediction_api.py
+"""
+Prediction endpoints
+Score sensor readings against the streaming anomaly detectors
+"""
+from typing import Dict, List
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from services.prediction_service import prediction_service
+
+router = APIRouter(prefix="/predictions", tags=["predictions"])
+
+
+class SensorReading(BaseModel):
+    machine_id: str
+    readings: Dict[str, float]
+
+
+def predict_reading(reading: SensorReading):
+    try:
+        anomalies = prediction_service.predict(reading.machine_id, reading.readings)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "machine_id": reading.machine_id,
+        "anomalous": any(anomalies.values()),
+        "anomalies": anomalies
+    }
+
+
+@router.post("")
+def predict(reading: SensorReading):
+    return {"success": True, "data": predict_reading(reading)}
+
+
+@router.post("/batch")
+def predict_batch(readings: List[SensorReading]):
+    return {"success": True, "data": [predict_reading(reading) for reading in readings]}
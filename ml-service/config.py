@@ -0,0 +1,47 @@
+# config.py
+"""
+Configuration file for the ML Service
+"""
+import os
+
+# Database Configuration (shared with the Node backend)
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/iot_automation')
+
+# Alert Aggregation
+ALERT_WINDOW_SECONDS = float(os.getenv('ALERT_WINDOW_SECONDS', 300))  # coalescing window per machine/type
+ALERT_FLUSH_INTERVAL = float(os.getenv('ALERT_FLUSH_INTERVAL', 2))  # seconds between bulk writes
+ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', 10000))
+DIGEST_INTERVAL = float(os.getenv('DIGEST_INTERVAL', 60))  # seconds between digest emails per user
+DIGEST_SEVERITIES = os.getenv('DIGEST_SEVERITIES', 'high,critical').split(',')
+DIGEST_ALERT_TYPES = os.getenv('DIGEST_ALERT_TYPES', 'failure_prediction').split(',')  # notified at any severity
+DIGEST_MAX_ATTEMPTS = int(os.getenv('DIGEST_MAX_ATTEMPTS', 10))  # digest runs before a group is given up
+
+# Email Configuration (same variables as the Node backend)
+SMTP_HOST = os.getenv('EMAIL_HOST', os.getenv('SMTP_HOST', 'localhost'))
+SMTP_PORT = int(os.getenv('EMAIL_PORT', os.getenv('SMTP_PORT', 1025)))
+SMTP_USER = os.getenv('EMAIL_USER', os.getenv('SMTP_EMAIL', ''))
+SMTP_PASSWORD = os.getenv('EMAIL_PASS', os.getenv('SMTP_PASSWORD', ''))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'false').lower() == 'true'  # require it; used whenever offered
+EMAIL_FROM = os.getenv('EMAIL_FROM', SMTP_USER or 'alerts@iot.local')
+FROM_NAME = os.getenv('FROM_NAME', 'IoT Industrial Automation')
+
+# Profiling (see services/profiler.py)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')  # sampling or cprofile
+PROFILE_DURATION = float(os.getenv('PROFILE_DURATION', 30))  # seconds
+PROFILE_MAX_DURATION = float(os.getenv('PROFILE_MAX_DURATION', 300))  # longest session a request may ask for
+PROFILE_STAGES = [stage for stage in os.getenv('PROFILE_STAGES', '').split(',') if stage]
+ADMIN_TOKEN = os.getenv('ML_ADMIN_TOKEN', '')
+
+# Shared-memory fleet state (see services/fleet_state.py)
+ML_WORKERS = int(os.getenv('ML_WORKERS', 1))
+FLEET_STATE_ENABLED = os.getenv('FLEET_STATE_ENABLED', 'true').lower() == 'true'
+FLEET_STATE_NAME = os.getenv('FLEET_STATE_NAME', 'iot_fleet_state')
+FLEET_MAX_MACHINES = int(os.getenv('FLEET_MAX_MACHINES', 1024))
+FLEET_HISTORY_WINDOW = int(os.getenv('FLEET_HISTORY_WINDOW', 30))  # rolling z-score window
+FLEET_IDLE_SECONDS = float(os.getenv('FLEET_IDLE_SECONDS', 3600))  # idle machines give up their slot when full
+FLEET_QUEUE_SIZE = int(os.getenv('FLEET_QUEUE_SIZE', 10000))  # readings waiting for the fleet state writer
+
+# Set by main.py for its uvicorn workers when ML_WORKERS > 1 (see services/worker_relay.py)
+WORKER_RELAY_ADDRESS = os.getenv('ML_WORKER_RELAY_ADDRESS', '')
+WORKER_RELAY_AUTHKEY = os.getenv('ML_WORKER_RELAY_AUTHKEY', '')
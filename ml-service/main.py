@@ -7,6 +7,18 @@ Provides predictive maintenance and analytics
 from fastapi import FastAPI
 from api.prediction_api import router as prediction_router
 from api.model_service import router as model_router
+from api.alert_api import router as alert_router
+from api.admin_api import router as admin_router
+from api.fleet_api import router as fleet_router
+from config import (FLEET_STATE_ENABLED, ML_WORKERS, PROFILE_DIR, PROFILE_DURATION,
+                    PROFILE_MAX_DURATION, PROFILE_MODE, PROFILE_STAGES, WORKER_RELAY_ADDRESS,
+                    WORKER_RELAY_AUTHKEY)
+from models.anomaly_detection import EWMADetector
+from services import worker_relay
+from services.alert_aggregator import AlertAggregator, alert_aggregator
+from services.fleet_state import FleetState, FleetWriter
+from services.prediction_service import PredictionService, prediction_service
+from services.profiler import profiler
 
 app = FastAPI(
     title="IoT ML Service",
@@ -17,11 +29,75 @@ app = FastAPI(
 # Include routers
 app.include_router(prediction_router, prefix="/api/v1")
 app.include_router(model_router, prefix="/api/v1")
+app.include_router(alert_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
+app.include_router(fleet_router, prefix="/api/v1")
+
+# Runtime profiling defaults and the stages it can be scoped to
+profiler.configure(PROFILE_DIR, PROFILE_MODE, PROFILE_DURATION, PROFILE_STAGES,
+                   PROFILE_MAX_DURATION)
+profiler.register_stage("predict", PredictionService, "predict")
+profiler.register_stage("alert_aggregation", AlertAggregator, "coalesce")
+profiler.register_stage("alert_flush", AlertAggregator, "flush")
+
+@app.on_event("startup")
+async def start_background_services():
+    # One of several workers: aggregation, fleet state writes and profiling control
+    # live in the supervisor
+    relay = None
+    if WORKER_RELAY_ADDRESS:
+        relay = worker_relay.connect(WORKER_RELAY_ADDRESS, WORKER_RELAY_AUTHKEY.encode())
+
+    if FLEET_STATE_ENABLED:
+        prediction_service.attach(FleetState.open(), relay.get_fleet_writer() if relay else None)
+    if relay is not None:
+        alert_aggregator.connect(relay.get_aggregator())
+        app.state.profile_control = relay.get_profile_control()
+        worker_relay.install_profile_handler(app.state.profile_control)
+    else:
+        alert_aggregator.start()
+        profiler.install_signal_handler()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    alert_aggregator.stop()
+    prediction_service.detach()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "ml-service"}
 
 if __name__ == "__main__":
+    import os
+    import secrets
+
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+
+    # The supervisor holds the fleet state segment for the lifetime of the service
+    fleet_state = FleetState.open() if FLEET_STATE_ENABLED else None
+    try:
+        if ML_WORKERS > 1:
+            # One aggregator and one fleet state writer for all workers, so alerts are
+            # coalesced and digested once and every seqlock has a single writer
+            fleet_writer = FleetWriter(fleet_state, EWMADetector()) if fleet_state else None
+            authkey = secrets.token_hex(16)
+            address, profile_control = worker_relay.serve(alert_aggregator, fleet_writer,
+                                                          authkey.encode())
+            os.environ['ML_WORKER_RELAY_ADDRESS'] = address
+            os.environ['ML_WORKER_RELAY_AUTHKEY'] = authkey
+            # `kill -USR1 <supervisor>` toggles profiling in every worker
+            worker_relay.install_supervisor_profile_handler(profile_control)
+            alert_aggregator.start()
+            if fleet_writer is not None:
+                fleet_writer.start()
+            try:
+                uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=ML_WORKERS)
+            finally:
+                alert_aggregator.stop()
+                if fleet_writer is not None:
+                    fleet_writer.stop()
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=8000)
+    finally:
+        if fleet_state is not None:
+            fleet_state.close()
@@ -0,0 +1,134 @@
+# anomaly_detection.py
+"""
+Streaming anomaly detectors for industrial sensor readings
+
+Every detector scores one reading at a time through the same interface:
+    score(machine_id, reading) -> set of flagged sensor names
+where `reading` is a flat dict of sensor name -> value (snake_case, as
+produced by the IoT simulator).
+"""
+import math
+from collections import defaultdict, deque
+
+
+def numeric_sensors(reading):
+    """Yield (sensor, value) pairs for the numeric sensors of a reading"""
+    for sensor, value in reading.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        yield sensor, value
+
+
+class ThresholdRuleDetector:
+    """Static threshold rules, mirroring server/src/services/predictionService.js"""
+
+    name = 'threshold'
+
+    def __init__(self, max_temperature=80, min_voltage=200, max_voltage=250,
+                 max_motor_speed=3000):
+        self.max_temperature = max_temperature
+        self.min_voltage = min_voltage
+        self.max_voltage = max_voltage
+        self.max_motor_speed = max_motor_speed
+
+    def reset(self):
+        """Threshold rules are stateless"""
+
+    def score(self, machine_id, reading):
+        flagged = set()
+
+        temperature = reading.get('temperature')
+        if temperature is not None and temperature > self.max_temperature:
+            flagged.add('temperature')
+
+        voltage = reading.get('voltage')
+        if voltage is not None and (voltage < self.min_voltage or voltage > self.max_voltage):
+            flagged.add('voltage')
+
+        motor_speed = reading.get('motor_speed')
+        if motor_speed is not None and motor_speed > self.max_motor_speed:
+            flagged.add('motor_speed')
+
+        return flagged
+
+
+class EWMADetector:
+    """Exponentially weighted mean/variance per machine and sensor"""
+
+    name = 'ewma'
+
+    def __init__(self, alpha=0.1, threshold=4.0, warmup=20):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.reset()
+
+    def reset(self):
+        # (machine_id, sensor) -> [count, mean, variance]
+        self.state = {}
+
+    def score(self, machine_id, reading):
+        flagged = set()
+
+        for sensor, value in numeric_sensors(reading):
+            key = (machine_id, sensor)
+            state = self.state.get(key)
+            if state is None:
+                self.state[key] = [1, float(value), 0.0]
+                continue
+
+            count, mean, variance = state
+            if self.flag(value, count, mean, variance):
+                flagged.add(sensor)
+            state[:] = self.update(value, count, mean, variance)
+
+        return flagged
+
+    def flag(self, value, count, mean, variance):
+        """True if value deviates more than `threshold` standard deviations"""
+        return (count >= self.warmup and variance > 0
+                and abs(value - mean) > self.threshold * math.sqrt(variance))
+
+    def update(self, value, count, mean, variance):
+        """Fold value into the running state; returns (count, mean, variance)"""
+        deviation = value - mean
+        increment = self.alpha * deviation
+        return count + 1, mean + increment, (1 - self.alpha) * (variance + deviation * increment)
+
+
+class RollingZScoreDetector:
+    """Z-score against a fixed-size window of recent values"""
+
+    name = 'zscore'
+
+    def __init__(self, window=30, threshold=3.5):
+        self.window = window
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.history = defaultdict(lambda: deque(maxlen=self.window))
+
+    def score(self, machine_id, reading):
+        flagged = set()
+
+        for sensor, value in numeric_sensors(reading):
+            history = self.history[(machine_id, sensor)]
+            if len(history) == self.window and self.flag(value, history):
+                flagged.add(sensor)
+            history.append(value)
+
+        return flagged
+
+    def flag(self, value, history):
+        """True if value is more than `threshold` standard deviations from a full window"""
+        mean = sum(history) / len(history)
+        variance = sum((x - mean) ** 2 for x in history) / len(history)
+        return variance > 0 and abs(value - mean) > self.threshold * math.sqrt(variance)
+
+
+DETECTORS = {
+    ThresholdRuleDetector.name: ThresholdRuleDetector,
+    EWMADetector.name: EWMADetector,
+    RollingZScoreDetector.name: RollingZScoreDetector,
+}
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# smtp_stub.py
+"""
+Local SMTP stub for testing alert digests
+Accepts every message and prints it to stdout instead of delivering it.
+Point the ml-service at it with EMAIL_HOST=localhost EMAIL_PORT=1025.
+"""
+import argparse
+import socketserver
+from email import message_from_bytes, policy
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 smtp-stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+
+            if command.startswith(('HELO', 'EHLO')):
+                self.reply("250 smtp-stub")
+            elif command.startswith(('MAIL FROM', 'RCPT TO', 'RSET', 'NOOP')):
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.receive_message()
+                self.reply("250 OK: queued")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def receive_message(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b".\r\n", b".\n", b""):
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+        message = message_from_bytes(b"".join(lines), policy=policy.default)
+        body = message.get_body(preferencelist=('plain', 'html'))
+        print(f"📧 To: {message['To']} | Subject: {message['Subject']}")
+        if body is not None:
+            print(body.get_content())
+        print("-" * 60, flush=True)
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stub")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    with SMTPStubServer((args.host, args.port), SMTPStubHandler) as server:
+        print(f"📮 SMTP stub listening on {args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
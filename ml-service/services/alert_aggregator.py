@@ -0,0 +1,195 @@
+# alert_aggregator.py
+"""
+Alert aggregation stage
+Deduplicates incoming alerts per (user, machine, alert type) over a sliding
+window, persists them in bulk and hands new alert groups to the digest
+notifier. Submission only enqueues, so callers never wait on the database or
+on SMTP.
+
+With several uvicorn workers only one process should run the aggregator; the
+others connect() to it through a proxy instead of starting their own, so
+alerts are deduplicated and digested once per service.
+"""
+import fcntl
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import (ALERT_FLUSH_INTERVAL, ALERT_QUEUE_SIZE, ALERT_WINDOW_SECONDS,
+                    DIGEST_ALERT_TYPES, DIGEST_SEVERITIES)
+
+SEVERITY_ORDER = ['low', 'medium', 'high', 'critical']
+
+
+class AlertAggregator:
+    def __init__(self, store=None, notifier=None, window=ALERT_WINDOW_SECONDS,
+                 flush_interval=ALERT_FLUSH_INTERVAL, queue_size=ALERT_QUEUE_SIZE):
+        self.store = store
+        self.notifier = notifier
+        self.window = window
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.groups = {}  # (userId, machineId, alertType) -> open alert group
+        self.stopped = threading.Event()
+        self.thread = None
+        self.remote = None  # proxy to the supervisor's aggregator in worker processes
+        self.owner_lock = None
+        self.logger = logging.getLogger('AlertAggregator')
+        self.stats = {'received': 0, 'dropped': 0, 'rejected': 0, 'coalesced': 0,
+                      'inserted': 0, 'updated': 0}
+
+    def start(self):
+        """Start the background aggregation thread and its notifier"""
+        if self.store is None:
+            from services.alert_store import AlertStore
+            self.store = AlertStore()
+        if self.notifier is None:
+            from services.notifier import DigestNotifier
+            self.notifier = DigestNotifier(self.store)
+
+        # `uvicorn --workers N` bypasses the relay and would run one aggregator per worker
+        self.owner_lock = open(os.path.join(tempfile.gettempdir(), 'iot-alert-aggregator.lock'), 'a')
+        try:
+            fcntl.flock(self.owner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.logger.warning("⚠️ Another alert aggregator is running on this host; start "
+                                "multi-worker deployments with `ML_WORKERS=N python main.py`")
+
+        self.notifier.start()
+        self.thread = threading.Thread(target=self.run, name='alert-aggregator', daemon=True)
+        self.thread.start()
+        self.logger.info(f"🚨 Alert aggregation started (window {self.window}s)")
+
+    def stop(self):
+        """Flush pending alerts and stop the background threads"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        if self.notifier:
+            self.notifier.stop()
+        if self.owner_lock is not None:
+            self.owner_lock.close()
+
+    def connect(self, remote):
+        """Forward alerts to the supervisor's aggregator (a worker_relay proxy)"""
+        self.remote = remote
+        self.logger.info("🚨 Forwarding alerts to the supervisor's aggregator")
+
+    def submit(self, alert):
+        """Queue an alert without blocking; returns False if the queue is full"""
+        try:
+            self.queue.put_nowait(alert)
+            self.stats['received'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def submit_many(self, alerts):
+        """Queue a batch of alerts (in one round trip when relayed); returns the number accepted"""
+        if self.remote is not None:
+            return self.remote.submit_many(alerts)
+        return sum(self.submit(alert) for alert in alerts)
+
+    def status(self):
+        """Counters, open groups and queue depth of the aggregator that owns the alerts"""
+        if self.remote is not None:
+            return self.remote.status()
+        return {
+            'aggregator': dict(self.stats),
+            'notifier': dict(self.notifier.stats) if self.notifier else None,
+            'open_groups': len(self.groups),
+            'queued': self.queue.qsize()
+        }
+
+    def run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self.stopped.is_set():
+            timeout = max(0.0, next_flush - time.monotonic())
+            try:
+                alert = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                self.safe_coalesce(alert)
+
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+        while not self.queue.empty():
+            self.safe_coalesce(self.queue.get_nowait())
+        self.flush()
+
+    def safe_coalesce(self, alert):
+        """Coalesce an alert, logging instead of letting a bad one kill the thread"""
+        try:
+            self.coalesce(alert)
+        except Exception as e:
+            self.stats['rejected'] += 1
+            self.logger.error(f"❌ Skipping alert {alert!r}: {e}")
+
+    def coalesce(self, alert):
+        """Fold an alert into the open group for its machine and type"""
+        now = datetime.now(timezone.utc)
+        key = (alert['userId'], alert['machineId'], alert['alertType'])
+        group = self.groups.get(key)
+
+        if group is not None and (now - group['lastSeenAt']).total_seconds() <= self.window:
+            group['occurrences'] += 1
+            group['lastSeenAt'] = now
+            group['message'] = alert['message']
+            if SEVERITY_ORDER.index(alert['severity']) > SEVERITY_ORDER.index(group['severity']):
+                group['severity'] = alert['severity']
+            if alert.get('confidence') is not None:
+                group['confidence'] = max(group.get('confidence') or 0, alert['confidence'])
+            group['dirty'] = True
+            self.stats['coalesced'] += 1
+            return
+
+        self.groups[key] = {
+            **alert,
+            '_id': None,
+            'occurrences': 1,
+            'firstSeenAt': now,
+            'lastSeenAt': now,
+            'dirty': True
+        }
+
+    def flush(self):
+        """Write dirty groups in bulk, notify new ones and expire idle groups"""
+        new_groups = [g for g in self.groups.values() if g['dirty'] and g['_id'] is None]
+        updated_groups = [g for g in self.groups.values() if g['dirty'] and g['_id'] is not None]
+
+        if new_groups or updated_groups:
+            try:
+                self.store.write(new_groups, updated_groups)
+            except Exception as e:
+                self.logger.error(f"❌ Bulk alert write failed: {e}")
+                return
+
+            for group in new_groups + updated_groups:
+                group['dirty'] = False
+            self.stats['inserted'] += len(new_groups)
+            self.stats['updated'] += len(updated_groups)
+
+            # Escalated groups are notified once they first reach a digest severity;
+            # digest alert types (failure predictions) are always notified
+            notify = [g for g in new_groups + updated_groups
+                      if (g['severity'] in DIGEST_SEVERITIES or g['alertType'] in DIGEST_ALERT_TYPES)
+                      and not g.get('notified')]
+            for group in notify:
+                group['notified'] = True
+            self.notifier.enqueue(notify)
+
+        now = datetime.now(timezone.utc)
+        for key in [k for k, g in self.groups.items()
+                    if not g['dirty'] and (now - g['lastSeenAt']).total_seconds() > self.window]:
+            del self.groups[key]
+
+
+alert_aggregator = AlertAggregator()
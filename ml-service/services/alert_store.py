@@ -0,0 +1,73 @@
+# alert_store.py
+"""
+Bulk persistence of coalesced maintenance alerts
+Writes into the same `maintenancealerts` collection as the Node backend's
+MaintenanceAlert model
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+
+from config import MONGODB_URI
+
+
+class AlertStore:
+    def __init__(self, uri=MONGODB_URI):
+        self.client = MongoClient(uri)
+        db = self.client.get_default_database()
+        self.alerts = db['maintenancealerts']
+        self.users = db['users']
+
+    def write(self, new_groups, updated_groups):
+        """Insert newly opened alert groups and update coalesced ones in bulk"""
+        now = datetime.now(timezone.utc)
+
+        if new_groups:
+            docs = [{
+                'userId': ObjectId(group['userId']),
+                'machineId': group['machineId'],
+                'alertType': group['alertType'],
+                'severity': group['severity'],
+                'message': group['message'],
+                'confidence': group.get('confidence'),
+                'predictedFailureDate': group.get('predictedFailureDate'),
+                'occurrences': group['occurrences'],
+                'lastSeenAt': group['lastSeenAt'],
+                'isResolved': False,
+                'emailSent': False,
+                'createdAt': group['firstSeenAt'],
+                'updatedAt': now
+            } for group in new_groups]
+            result = self.alerts.insert_many(docs, ordered=False)
+            for group, inserted_id in zip(new_groups, result.inserted_ids):
+                group['_id'] = inserted_id
+
+        if updated_groups:
+            self.alerts.bulk_write([
+                UpdateOne({'_id': group['_id']}, {'$set': {
+                    'severity': group['severity'],
+                    'message': group['message'],
+                    'confidence': group.get('confidence'),
+                    'occurrences': group['occurrences'],
+                    'lastSeenAt': group['lastSeenAt'],
+                    'updatedAt': now
+                }})
+                for group in updated_groups
+            ], ordered=False)
+
+    def mark_emailed(self, alert_ids):
+        """Flag alerts as notified once their digest has been sent"""
+        now = datetime.now(timezone.utc)
+        self.alerts.update_many(
+            {'_id': {'$in': list(alert_ids)}},
+            {'$set': {'emailSent': True, 'emailSentAt': now, 'updatedAt': now}}
+        )
+
+    def user_emails(self, user_ids):
+        """Resolve user ids to email addresses with a single query"""
+        cursor = self.users.find(
+            {'_id': {'$in': [ObjectId(user_id) for user_id in user_ids]}},
+            {'email': 1}
+        )
+        return {str(user['_id']): user['email'] for user in cursor}
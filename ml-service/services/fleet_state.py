@@ -0,0 +1,535 @@
+# fleet_state.py
+"""
+Shared-memory fleet state
+Per-machine, per-sensor rolling state kept in one multiprocessing.shared_memory
+segment so that every uvicorn worker reads the same, current values without
+copying them through IPC. Both stateful detectors live here: the EWMA
+mean/variance and the rolling z-score window.
+
+Prediction scores a reading against a seqlock snapshot of its machine and never
+takes the writer lock; the reading is then handed to the FleetWriter, which
+folds ingested readings into the segment in batches. A multi-worker service
+runs a single FleetWriter in the supervisor (services/worker_relay.py).
+
+Segment layout (all fields 8-byte aligned):
+    header      uint64[8]                          magic, version, max_machines,
+                                                   sensor count, machine count,
+                                                   window
+    ids         S32[max_machines]                  machine-id index
+    seq         uint64[max_machines]               per-machine seqlock counters
+    updated_at  float64[max_machines]              last update (unix seconds)
+    values      float64[max_machines, sensors, 4]  last, mean, variance, count
+    history     float64[max_machines, sensors, window]  z-score ring buffers
+
+Writes also take a writer lock (thread lock + flock on a lock file), so each
+seqlock only ever sees one writer even when several processes write, as under a
+bare `uvicorn --workers N`. A writer makes the counter odd, updates the row and
+makes it even again; readers retry while it is odd or changed, and check that
+the slot still belongs to their machine.
+
+When every slot is taken, the longest-idle machine (not updated for
+FLEET_IDLE_SECONDS) gives up its slot; reset() frees all of them.
+
+Every process using the segment holds a shared flock on a users file. open()
+recreates a segment nobody holds (left behind by a crash or an old layout), and
+close() unlinks the segment when the last user detaches, however the service
+was started.
+"""
+import fcntl
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from config import (FLEET_HISTORY_WINDOW, FLEET_IDLE_SECONDS, FLEET_MAX_MACHINES, FLEET_QUEUE_SIZE,
+                    FLEET_STATE_NAME)
+from models.anomaly_detection import numeric_sensors
+
+FLEET_SENSORS = (
+    'temperature', 'pressure', 'vibration', 'humidity',
+    'motor_speed', 'voltage', 'heat', 'working_period'
+)
+FIELDS = ('last', 'mean', 'variance', 'count')
+MAGIC = int.from_bytes(b'FLEETST1', 'little')
+VERSION = 3
+ID_BYTES = 32
+HEADER_WORDS = 8
+MAGIC_WORD, VERSION_WORD, MAX_MACHINES_WORD, SENSORS_WORD, COUNT_WORD, WINDOW_WORD = range(6)
+COUNT_FIELD = FIELDS.index('count')
+
+
+def segment_layout(max_machines, sensor_count, window):
+    """Return (offsets, total size) for a segment of the given dimensions"""
+    sizes = {
+        'header': HEADER_WORDS * 8,
+        'ids': max_machines * ID_BYTES,
+        'seq': max_machines * 8,
+        'updated_at': max_machines * 8,
+        'values': max_machines * sensor_count * len(FIELDS) * 8,
+        'history': max_machines * sensor_count * window * 8,
+    }
+    offsets = {}
+    offset = 0
+    for name, size in sizes.items():
+        offsets[name] = offset
+        offset += size
+    return offsets, offset
+
+
+def lock_path(name, suffix):
+    return os.path.join(tempfile.gettempdir(), f"{name.lstrip('/')}.{suffix}")
+
+
+class FleetState:
+    def __init__(self, shm, users_file=None):
+        self.shm = shm
+        self.users_file = users_file
+        self.header = np.ndarray((HEADER_WORDS,), np.uint64, shm.buf, 0)
+
+        # The creating process may still be writing the header
+        deadline = time.monotonic() + 1
+        while self.header[MAGIC_WORD] != MAGIC:
+            if time.monotonic() > deadline:
+                raise ValueError(f"Shared memory segment '{shm.name}' is not a fleet state segment")
+            time.sleep(0.01)
+        if self.header[VERSION_WORD] != VERSION or self.header[SENSORS_WORD] != len(FLEET_SENSORS):
+            raise ValueError(f"Fleet state segment '{shm.name}' has an incompatible layout")
+
+        self.max_machines = int(self.header[MAX_MACHINES_WORD])
+        self.window = int(self.header[WINDOW_WORD])
+        offsets, _ = segment_layout(self.max_machines, len(FLEET_SENSORS), self.window)
+        self.ids = np.ndarray((self.max_machines,), f'S{ID_BYTES}', shm.buf, offsets['ids'])
+        self.seq = np.ndarray((self.max_machines,), np.uint64, shm.buf, offsets['seq'])
+        self.updated_at = np.ndarray((self.max_machines,), np.float64, shm.buf, offsets['updated_at'])
+        self.values = np.ndarray((self.max_machines, len(FLEET_SENSORS), len(FIELDS)),
+                                 np.float64, shm.buf, offsets['values'])
+        self.history = np.ndarray((self.max_machines, len(FLEET_SENSORS), self.window),
+                                  np.float64, shm.buf, offsets['history'])
+
+        self.sensor_index = {sensor: i for i, sensor in enumerate(FLEET_SENSORS)}
+        self.slots = {}  # local cache of machine id -> slot, checked against ids on use
+        self.idle_seconds = FLEET_IDLE_SECONDS
+        self.thread_lock = threading.Lock()
+        self.lock_path = lock_path(shm.name, 'lock')
+        self.lock_file = None
+
+    @classmethod
+    def create(cls, name=FLEET_STATE_NAME, max_machines=FLEET_MAX_MACHINES,
+               window=FLEET_HISTORY_WINDOW, users_file=None):
+        """Create and initialize a new segment"""
+        _, size = segment_layout(max_machines, len(FLEET_SENSORS), window)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        # Segment lifetime is managed explicitly, not by the per-process resource tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+        header = np.ndarray((HEADER_WORDS,), np.uint64, shm.buf, 0)
+        header[VERSION_WORD] = VERSION
+        header[MAX_MACHINES_WORD] = max_machines
+        header[SENSORS_WORD] = len(FLEET_SENSORS)
+        header[COUNT_WORD] = 0
+        header[WINDOW_WORD] = window
+        offsets, _ = segment_layout(max_machines, len(FLEET_SENSORS), window)
+        values = np.ndarray((max_machines, len(FLEET_SENSORS), len(FIELDS)),
+                            np.float64, shm.buf, offsets['values'])
+        values[...] = np.nan
+        values[..., COUNT_FIELD] = 0
+        header[MAGIC_WORD] = MAGIC
+        return cls(shm, users_file)
+
+    @classmethod
+    def attach(cls, name=FLEET_STATE_NAME, users_file=None):
+        """Attach to an existing segment"""
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, users_file)
+
+    @classmethod
+    def open(cls, name=FLEET_STATE_NAME, max_machines=FLEET_MAX_MACHINES,
+             window=FLEET_HISTORY_WINDOW):
+        """Attach to the live segment, creating it if no other process is using one"""
+        users_file = open(lock_path(name, 'users'), 'a')
+        with open(lock_path(name, 'lock'), 'a') as open_lock:
+            fcntl.flock(open_lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    fcntl.flock(users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    in_use = False
+                except BlockingIOError:
+                    in_use = True
+
+                if in_use:
+                    state = cls.attach(name, users_file)
+                else:
+                    # Nobody holds the segment, so any existing one is stale
+                    cls.discard(name)
+                    state = cls.create(name, max_machines, window, users_file)
+                fcntl.flock(users_file, fcntl.LOCK_SH)
+            except BaseException:
+                users_file.close()
+                raise
+            finally:
+                fcntl.flock(open_lock, fcntl.LOCK_UN)
+        return state
+
+    @staticmethod
+    def discard(name):
+        """Unlink a segment by name if it exists"""
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+
+    def close(self):
+        """Detach this process; the last user opened with open() also unlinks the segment"""
+        # Drop numpy views before closing the underlying buffer
+        self.header = self.ids = self.seq = self.updated_at = self.values = self.history = None
+        self.shm.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+
+        if self.users_file is not None:
+            with open(lock_path(self.shm.name, 'lock'), 'a') as open_lock:
+                fcntl.flock(open_lock, fcntl.LOCK_EX)
+                try:
+                    fcntl.flock(self.users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self.unlink()
+                except BlockingIOError:
+                    pass
+                finally:
+                    self.users_file.close()
+                    self.users_file = None
+                    fcntl.flock(open_lock, fcntl.LOCK_UN)
+
+    def unlink(self):
+        """Remove the segment once every process is done with it"""
+        # SharedMemory.unlink unregisters from the resource tracker, which expects a registration
+        resource_tracker.register(self.shm._name, 'shared_memory')
+        self.shm.unlink()
+
+    @contextmanager
+    def writer_lock(self):
+        with self.thread_lock:
+            if self.lock_file is None:
+                self.lock_file = open(self.lock_path, 'a')
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def machine_ids(self):
+        count = int(self.header[COUNT_WORD])
+        return [machine_id.decode() for machine_id in self.ids[:count]]
+
+    def slot(self, machine_id):
+        """Return the slot of a machine, or None if it has none"""
+        encoded = machine_id.encode()
+        slot = self.slots.get(machine_id)
+        # A cached slot may have been reclaimed or reset since
+        if slot is not None and self.ids[slot] == encoded:
+            return slot
+
+        count = int(self.header[COUNT_WORD])
+        matches = np.flatnonzero(self.ids[:count] == encoded)
+        if matches.size == 0:
+            self.slots.pop(machine_id, None)
+            return None
+        slot = self.slots[machine_id] = int(matches[0])
+        return slot
+
+    def holds(self, machine_id):
+        """True if the machine has a slot, or a free one is left for it"""
+        if self.slot(machine_id) is not None:
+            return True
+        return (len(machine_id.encode()) <= ID_BYTES
+                and int(self.header[COUNT_WORD]) < self.max_machines)
+
+    def allocate(self, machine_id, now):
+        """Assign a slot to a new machine, reclaiming the longest-idle one if all are taken
+
+        Returns None if the id is too long or no slot is idle. Caller must hold
+        the writer lock.
+        """
+        encoded = machine_id.encode()
+        if len(encoded) > ID_BYTES:
+            return None
+
+        count = int(self.header[COUNT_WORD])
+        if count < self.max_machines:
+            slot = count
+            self.ids[slot] = encoded
+            # Publish the id before the count so readers never see an empty slot
+            self.header[COUNT_WORD] = count + 1
+        else:
+            slot = int(np.argmin(self.updated_at[:count]))
+            if self.updated_at[slot] > now - self.idle_seconds:
+                return None
+            self.begin_write(slot)
+            self.ids[slot] = encoded
+            self.clear(slice(slot, slot + 1))
+            self.seq[slot] += 1
+
+        self.slots[machine_id] = slot
+        return slot
+
+    def clear(self, slots):
+        """Empty the detector state of a range of slots; caller must hold their seqlocks"""
+        self.values[slots] = np.nan
+        self.values[slots, :, COUNT_FIELD] = 0
+        self.history[slots] = 0
+        self.updated_at[slots] = 0
+
+    def begin_write(self, slot):
+        """Make a slot's seqlock odd; caller must hold the writer lock"""
+        # An odd counter here means a writer died mid-update; even it out first
+        if self.seq[slot] & 1:
+            self.seq[slot] += 1
+        self.seq[slot] += 1
+
+    def apply(self, batch, ewma):
+        """Fold ingested (machine_id, reading, timestamp) items into the segment
+
+        `ewma` provides the EWMA update; the z-score window is stored as is.
+        Returns the number of readings stored; the rest belong to machines that
+        could not be given a slot.
+        """
+        stored = 0
+        with self.writer_lock():
+            for machine_id, reading, timestamp in batch:
+                slot = self.slot(machine_id)
+                if slot is None:
+                    slot = self.allocate(machine_id, timestamp)
+                    if slot is None:
+                        continue
+                row = self.values[slot]
+                history = self.history[slot]
+
+                self.begin_write(slot)
+                try:
+                    for sensor, value in numeric_sensors(reading):
+                        index = self.sensor_index.get(sensor)
+                        if index is None:
+                            continue
+
+                        _, mean, variance, count = row[index]
+                        history[index, int(count) % self.window] = value
+                        if count == 0:
+                            row[index] = (value, value, 0.0, 1)
+                            continue
+                        count, mean, variance = ewma.update(value, count, mean, variance)
+                        row[index] = (value, mean, variance, count)
+
+                    self.updated_at[slot] = timestamp
+                finally:
+                    self.seq[slot] += 1
+                stored += 1
+
+        return stored
+
+    def reset(self):
+        """Clear the detector state of every machine and free their slots"""
+        with self.writer_lock():
+            count = int(self.header[COUNT_WORD])
+            for slot in range(count):
+                self.begin_write(slot)
+            self.ids[:count] = b''
+            self.clear(slice(0, count))
+            self.header[COUNT_WORD] = 0
+            self.seq[:count] += 1
+            self.slots.clear()
+
+    def snapshot(self, machine_id, timeout=1.0):
+        """Consistent copy of a machine's (values, history, updated_at), or None if it has no slot
+
+        Never takes the writer lock. Raises TimeoutError if no consistent copy
+        could be taken in `timeout` seconds (a writer holding the slot that
+        long has stalled).
+        """
+        encoded = machine_id.encode()
+        deadline = time.monotonic() + timeout
+        while True:
+            slot = self.slot(machine_id)
+            if slot is None:
+                return None
+
+            before = int(self.seq[slot])
+            if not before & 1:
+                owner = self.ids[slot]
+                values = self.values[slot].copy()
+                history = self.history[slot].copy()
+                updated_at = float(self.updated_at[slot])
+                if int(self.seq[slot]) == before:
+                    if owner == encoded:
+                        return values, history, updated_at
+                    continue  # the slot was reclaimed mid-lookup; find the machine again
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Fleet state for machine {machine_id} is locked by a stalled writer")
+            time.sleep(0)
+
+    def score(self, machine_id, reading, ewma, zscore=None):
+        """Score a reading against a snapshot of the shared detector state
+
+        `ewma` and `zscore` provide the thresholds; normally the prediction
+        service's detectors. Returns detector name -> set of flagged sensors.
+        """
+        flagged = {ewma.name: set()}
+        if zscore is not None:
+            flagged[zscore.name] = set()
+
+        snapshot = self.snapshot(machine_id)
+        if snapshot is None:
+            return flagged
+
+        # Plain floats: the detector formulas are much slower on numpy scalars
+        values, history = snapshot[0].tolist(), snapshot[1].tolist()
+        for sensor, value in numeric_sensors(reading):
+            index = self.sensor_index.get(sensor)
+            if index is None:
+                continue
+
+            _, mean, variance, count = values[index]
+            if zscore is not None and count >= self.window and zscore.flag(value, history[index]):
+                flagged[zscore.name].add(sensor)
+            if count > 0 and ewma.flag(value, count, mean, variance):
+                flagged[ewma.name].add(sensor)
+
+        return flagged
+
+    def read(self, machine_id, timeout=1.0):
+        """Consistent copy of a machine's state, or None if it is unknown
+
+        Raises TimeoutError like snapshot().
+        """
+        snapshot = self.snapshot(machine_id, timeout)
+        if snapshot is None:
+            return None
+
+        values, _, updated_at = snapshot
+        return {
+            'machine_id': machine_id,
+            'updated_at': updated_at,
+            'sensors': {
+                sensor: dict(zip(FIELDS, values[i].tolist()))
+                for i, sensor in enumerate(FLEET_SENSORS)
+                if values[i, COUNT_FIELD] > 0
+            }
+        }
+
+
+class FleetWriter:
+    """Feeds ingested readings to a fleet state segment from one background thread
+
+    submit() only enqueues, so prediction never waits on the writer lock. A
+    writer connect()ed to the supervisor's writer (a worker_relay proxy)
+    forwards its batches there instead, so a multi-worker service has exactly
+    one thread writing the segment.
+    """
+
+    def __init__(self, fleet_state, ewma, queue_size=FLEET_QUEUE_SIZE, batch_size=1000):
+        self.fleet_state = fleet_state
+        self.ewma = ewma
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.thread = None
+        self.remote = None
+        self.logger = logging.getLogger('FleetWriter')
+        self.stats = {'received': 0, 'dropped': 0, 'stored': 0, 'overflow': 0, 'failed': 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='fleet-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write what is still queued and stop the background thread"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def connect(self, remote):
+        """Forward batches to the supervisor's writer"""
+        self.remote = remote
+        self.logger.info("🧠 Forwarding fleet state updates to the supervisor's writer")
+
+    def submit(self, machine_id, reading, timestamp=None):
+        """Queue a reading without blocking; returns False if the queue is full"""
+        try:
+            self.queue.put_nowait((machine_id, reading, timestamp or time.time()))
+            self.stats['received'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def ingest_many(self, batch):
+        """Queue a batch forwarded by a worker; returns the number accepted"""
+        return sum(self.submit(*item) for item in batch)
+
+    def flush(self):
+        """Block until every queued reading has been written (or forwarded)"""
+        self.queue.join()
+
+    def reset(self):
+        """Discard queued readings and clear the shared state"""
+        for _ in self.drain():
+            self.queue.task_done()
+        if self.remote is not None:
+            self.remote.reset()
+        else:
+            self.fleet_state.reset()
+
+    def drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                first = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.write([first] + self.drain())
+
+        while True:
+            batch = self.drain()
+            if not batch:
+                break
+            self.write(batch)
+
+    def write(self, batch):
+        try:
+            self.store(batch)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def store(self, batch):
+        try:
+            if self.remote is not None:
+                self.remote.ingest_many(batch)
+                return
+            stored = self.fleet_state.apply(batch, self.ewma)
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            self.logger.error(f"❌ Fleet state update of {len(batch)} readings failed: {e}")
+            return
+
+        self.stats['stored'] += stored
+        if stored < len(batch):
+            if not self.stats['overflow']:
+                self.logger.warning("⚠️ Fleet state is full; machines without a slot are scored by "
+                                    "each worker's local detectors (see FLEET_MAX_MACHINES)")
+            self.stats['overflow'] += len(batch) - stored
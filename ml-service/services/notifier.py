@@ -0,0 +1,157 @@
+# notifier.py
+"""
+Digest email notifications for maintenance alerts
+Alerts are queued by the aggregator and mailed from a background thread, one
+digest per user per DIGEST_INTERVAL, so SMTP latency never reaches ingest.
+"""
+import html
+import logging
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+
+from config import (DIGEST_INTERVAL, DIGEST_MAX_ATTEMPTS, EMAIL_FROM, FROM_NAME, SMTP_HOST,
+                    SMTP_PASSWORD, SMTP_PORT, SMTP_STARTTLS, SMTP_USER)
+
+SEVERITY_COLORS = {
+    'low': '#28a745',
+    'medium': '#ffc107',
+    'high': '#fd7e14',
+    'critical': '#dc3545'
+}
+
+
+class DigestNotifier:
+    def __init__(self, store, interval=DIGEST_INTERVAL, max_attempts=DIGEST_MAX_ATTEMPTS):
+        self.store = store
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.logger = logging.getLogger('DigestNotifier')
+        self.stats = {'digests_sent': 0, 'alerts_notified': 0, 'send_failures': 0,
+                      'retries': 0, 'abandoned': 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='digest-notifier', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def enqueue(self, groups):
+        """Queue alert groups for the next digest"""
+        for group in groups:
+            self.queue.put(dict(group))
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.send_pending()
+        self.send_pending()
+
+    def retry(self, groups):
+        """Queue groups again for the next digest run, giving up after max_attempts"""
+        for group in groups:
+            group['attempts'] = group.get('attempts', 0) + 1
+            if group['attempts'] >= self.max_attempts:
+                self.stats['abandoned'] += 1
+                self.logger.error(f"❌ Giving up on alert {group['_id']} after {group['attempts']} attempts")
+                continue
+            self.stats['retries'] += 1
+            self.queue.put(group)
+
+    def drain(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self.queue.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def send_pending(self):
+        """Send one digest per user for everything queued since the last run"""
+        pending = self.drain()
+        if not pending:
+            return
+
+        by_user = {}
+        for group in pending:
+            by_user.setdefault(group['userId'], []).append(group)
+
+        try:
+            emails = self.store.user_emails(by_user)
+        except Exception as e:
+            self.logger.error(f"❌ Failed to resolve digest recipients: {e}")
+            self.retry(pending)
+            return
+
+        for user_id, groups in by_user.items():
+            email = emails.get(user_id)
+            if not email:
+                continue
+
+            try:
+                self.send_digest(email, groups)
+            except Exception as e:
+                self.stats['send_failures'] += 1
+                self.logger.error(f"❌ Failed to send alert digest to {email}: {e}")
+                self.retry(groups)
+                continue
+
+            self.stats['digests_sent'] += 1
+            self.stats['alerts_notified'] += len(groups)
+            try:
+                self.store.mark_emailed(group['_id'] for group in groups)
+            except Exception as e:
+                self.logger.error(f"❌ Failed to mark digest alerts as emailed: {e}")
+
+    def send_digest(self, to, groups):
+        message = EmailMessage()
+        worst = max(groups, key=lambda group: list(SEVERITY_COLORS).index(group['severity']))
+        message['Subject'] = (f"{worst['severity'].upper()} Maintenance Alert Digest - "
+                              f"{len(groups)} alert(s)")
+        message['From'] = f'"{FROM_NAME}" <{EMAIL_FROM}>'
+        message['To'] = to
+        message.set_content('\n'.join(
+            f"[{group['severity'].upper()}] {group['machineId']} {group['alertType']}: "
+            f"{group['message']} (x{group['occurrences']})"
+            for group in groups
+        ))
+        message.add_alternative(self.render_html(groups), subtype='html')
+
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+            # Upgrade whenever the server offers it, as nodemailer does for the Node backend
+            smtp.ehlo()
+            if SMTP_STARTTLS or smtp.has_extn('starttls'):
+                smtp.starttls()
+                smtp.ehlo()
+            if SMTP_USER and SMTP_PASSWORD:
+                smtp.login(SMTP_USER, SMTP_PASSWORD)
+            smtp.send_message(message)
+
+    def render_html(self, groups):
+        rows = ''.join(
+            f'<tr>'
+            f'<td style="color: {SEVERITY_COLORS.get(group["severity"], "#333")};">'
+            f'{group["severity"].upper()}</td>'
+            f'<td>{html.escape(group["machineId"])}</td>'
+            f'<td>{html.escape(group["alertType"])}</td>'
+            f'<td>{html.escape(group["message"])}</td>'
+            f'<td>{group["occurrences"]}</td>'
+            f'</tr>'
+            for group in groups
+        )
+        return f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #333; text-align: center;">Maintenance Alert Digest</h1>
+                <table style="width: 100%; border-collapse: collapse;">
+                    <tr><th>Severity</th><th>Machine ID</th><th>Alert Type</th><th>Message</th><th>Occurrences</th></tr>
+                    {rows}
+                </table>
+                <p style="margin-top: 20px;">Please log in to your dashboard to view more details and take appropriate action.</p>
+            </div>
+        """
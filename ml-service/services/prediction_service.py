@@ -0,0 +1,76 @@
+# prediction_service.py
+"""
+Prediction service
+Keeps one streaming instance of every anomaly detector so that per-machine
+state carries over between requests. With a fleet state attached, the EWMA and
+rolling z-score state lives in shared memory and is shared by all worker
+processes: readings are scored against a snapshot of it and handed to the
+fleet writer. The stateless threshold rules, and machines the segment has no
+room for, are scored locally.
+"""
+import threading
+
+from models.anomaly_detection import DETECTORS, EWMADetector, RollingZScoreDetector
+from services.fleet_state import FleetWriter
+
+SHARED_DETECTORS = (EWMADetector.name, RollingZScoreDetector.name)
+
+
+class PredictionService:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fleet_state = None
+        self.fleet_writer = None
+        self.reset()
+
+    def attach(self, fleet_state, remote_writer=None):
+        """Share the stateful detectors through a fleet state segment
+
+        Ingested readings go to a local FleetWriter, or through it to
+        `remote_writer` (the supervisor's, over services/worker_relay.py).
+        """
+        fleet_writer = FleetWriter(fleet_state, self.detectors[EWMADetector.name])
+        if remote_writer is not None:
+            fleet_writer.connect(remote_writer)
+        fleet_writer.start()
+        self.fleet_state, self.fleet_writer = fleet_state, fleet_writer
+
+    def detach(self):
+        """Write pending readings and release the fleet state"""
+        if self.fleet_writer is not None:
+            self.fleet_writer.stop()
+        if self.fleet_state is not None:
+            self.fleet_state.close()
+        self.fleet_state = self.fleet_writer = None
+
+    def reset(self):
+        """Discard all per-machine detector state, including the shared fleet state"""
+        with self.lock:
+            self.detectors = {name: detector_class() for name, detector_class in DETECTORS.items()}
+        if self.fleet_writer is not None:
+            self.fleet_writer.reset()
+
+    def predict(self, machine_id, reading):
+        """Score a reading with every detector; returns detector -> flagged sensors"""
+        fleet_state = self.fleet_state
+        shared = fleet_state is not None and fleet_state.holds(machine_id)
+
+        anomalies = {}
+        with self.lock:
+            for name, detector in self.detectors.items():
+                if shared and name in SHARED_DETECTORS:
+                    continue
+                anomalies[name] = sorted(detector.score(machine_id, reading))
+
+        if shared:
+            flagged = fleet_state.score(machine_id, reading,
+                                        self.detectors[EWMADetector.name],
+                                        self.detectors[RollingZScoreDetector.name])
+            anomalies.update({name: sorted(sensors) for name, sensors in flagged.items()})
+        if fleet_state is not None:
+            self.fleet_writer.submit(machine_id, reading)
+
+        return {name: anomalies[name] for name in self.detectors}
+
+
+prediction_service = PredictionService()
@@ -0,0 +1,248 @@
+# profiler.py
+"""
+On-demand profiling hooks
+Time-boxed cProfile or sampling sessions with optional tracemalloc, scoped to
+registered stages and switched on at runtime. Nothing is installed while no
+session is running, so a disabled profiler costs nothing on the hot path.
+
+Artifacts are written to the configured output directory (PROFILE_DIR):
+    *.collapsed        sampling profile in folded-stack format
+                       (flamegraph.pl, speedscope, inferno)
+    *.prof             cProfile stats (pstats, snakeviz, flameprof)
+    *.tracemalloc.txt  top allocation sites
+
+The iot-simulator imports this module from here as well, so it reads no
+service config: each service calls profiler.configure() with its own settings.
+"""
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+
+class Profiler:
+    def __init__(self, output_dir='profiles', mode='sampling', duration=30, stages=None,
+                 max_duration=300):
+        self.stages = {}  # stage name -> (owner, attribute)
+        self.session = None
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('Profiler')
+        self.output_dir = output_dir
+        self.mode = mode
+        self.duration = duration
+        self.default_stages = list(stages or [])
+        self.max_duration = max_duration
+
+    def configure(self, output_dir=None, mode=None, duration=None, stages=None, max_duration=None):
+        """Set the artifact directory and the defaults used by start() and toggle()"""
+        if output_dir is not None:
+            self.output_dir = output_dir
+        if mode is not None:
+            self.mode = mode
+        if duration is not None:
+            self.duration = duration
+        if stages is not None:
+            self.default_stages = list(stages)
+        if max_duration is not None:
+            self.max_duration = max_duration
+
+    def register_stage(self, name, owner, attribute):
+        """Register a function (owner.attribute) that profiling can be scoped to"""
+        self.stages[name] = (owner, attribute)
+
+    def start(self, mode=None, duration=None, stages=None, memory=False, interval=0.005, top=25):
+        """Start a time-boxed profiling session; returns the session status"""
+        mode = mode or self.mode
+        duration = duration or self.duration
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+        if not 0 < duration <= self.max_duration:
+            raise ValueError(f"Profile duration must be between 0 and {self.max_duration}s")
+        stages = list(stages or [])
+        unknown = [stage for stage in stages if stage not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown profile stages: {', '.join(unknown)}")
+
+        with self.lock:
+            if self.session is not None:
+                raise RuntimeError("A profiling session is already running")
+
+            session = ProfileSession(self, mode, stages or list(self.stages), memory, interval, top)
+            session.start()
+            session.timer = threading.Timer(duration, self.stop)
+            session.timer.daemon = True
+            session.timer.start()
+            session.duration = duration
+            self.session = session
+
+        self.logger.info(f"🔬 Started {mode} profile for {duration}s "
+                         f"(stages: {', '.join(session.stages) or 'all'})")
+        return self.status()
+
+    def stop(self):
+        """Stop the running session and write its artifacts; returns their paths"""
+        with self.lock:
+            session, self.session = self.session, None
+        if session is None:
+            return []
+
+        session.timer.cancel()
+        os.makedirs(self.output_dir, exist_ok=True)
+        artifacts = session.stop(self.output_dir)
+        self.logger.info(f"🔬 Profile written: {', '.join(artifacts) or 'no samples'}")
+        return artifacts
+
+    def status(self):
+        session = self.session
+        if session is None:
+            return {'running': False, 'stages': sorted(self.stages)}
+        return {
+            'running': True,
+            'mode': session.mode,
+            'stages': session.stages,
+            'memory': session.memory,
+            'duration': session.duration,
+            'elapsed': round(time.monotonic() - session.started, 3)
+        }
+
+    def toggle(self, *_):
+        """Signal handler: start a session with the configured defaults, or stop it"""
+        if self.session is None:
+            threading.Thread(target=self.start, kwargs={'stages': self.default_stages},
+                             daemon=True).start()
+        else:
+            threading.Thread(target=self.stop, daemon=True).start()
+
+    def install_signal_handler(self, signum=getattr(signal, 'SIGUSR1', None)):
+        """Toggle profiling with a signal (SIGUSR1 by default, POSIX only)"""
+        if signum is not None:
+            signal.signal(signum, self.toggle)
+
+
+class ProfileSession:
+    def __init__(self, profiler, mode, stages, memory, interval, top):
+        self.profiler = profiler
+        self.mode = mode
+        self.stages = stages
+        self.memory = memory
+        self.interval = interval
+        self.top = top
+        self.started = time.monotonic()
+        self.label = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{mode}"
+        self.targets = [profiler.stages[stage] for stage in stages]
+        self.originals = []
+        self.profiles = []
+        self.local = threading.local()
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.sampler = None
+        self.started_tracemalloc = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self.started_tracemalloc = True
+
+        if self.mode == 'cprofile':
+            for owner, attribute in self.targets:
+                original = getattr(owner, attribute)
+                self.originals.append((owner, attribute, original))
+                setattr(owner, attribute, self.wrap(original))
+        else:
+            self.codes = {inspect.unwrap(getattr(owner, attribute)).__code__
+                          for owner, attribute in self.targets}
+            self.sampler = threading.Thread(target=self.sample, name='profile-sampler', daemon=True)
+            self.sampler.start()
+
+    def stop(self, output_dir):
+        artifacts = []
+        base = os.path.join(output_dir, self.label)
+
+        if self.mode == 'cprofile':
+            for owner, attribute, original in self.originals:
+                setattr(owner, attribute, original)
+            profiles = [profile for profile in self.profiles if profile.getstats()]
+            if profiles:
+                stats = pstats.Stats(*profiles)
+                stats.dump_stats(f"{base}.prof")
+                artifacts.append(f"{base}.prof")
+        else:
+            self.stopped.set()
+            self.sampler.join()
+            if self.samples:
+                with open(f"{base}.collapsed", 'w') as f:
+                    for stack, count in self.samples.most_common():
+                        f.write(f"{stack} {count}\n")
+                artifacts.append(f"{base}.collapsed")
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__)
+            ])
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+            with open(f"{base}.tracemalloc.txt", 'w') as f:
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+            artifacts.append(f"{base}.tracemalloc.txt")
+
+        return artifacts
+
+    def wrap(self, func):
+        """Profile calls to func in the calling thread; nested calls share one enable"""
+        session = self
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            local = session.local
+            profile = getattr(local, 'profile', None)
+            if profile is None:
+                profile = local.profile = cProfile.Profile()
+                local.depth = 0
+                with session.profiler.lock:
+                    session.profiles.append(profile)
+
+            if local.depth == 0:
+                profile.enable()
+            local.depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                local.depth -= 1
+                if local.depth == 0:
+                    profile.disable()
+
+        return profiled
+
+    def sample(self):
+        own_thread = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+
+                stack = []
+                in_scope = not self.codes
+                while frame is not None:
+                    code = frame.f_code
+                    in_scope = in_scope or code in self.codes
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+
+                if in_scope:
+                    self.samples[';'.join(reversed(stack))] += 1
+
+
+profiler = Profiler()
@@ -0,0 +1,115 @@
+# worker_relay.py
+"""
+Supervisor/worker relay
+With several uvicorn workers, main.py's supervisor process owns everything that
+must exist once per service (the alert aggregator, the fleet state writer and
+profiling control) and serves it to the workers over a unix socket with
+multiprocessing.managers.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+from multiprocessing.managers import BaseManager
+
+from services.profiler import profiler
+
+
+class WorkerRelay(BaseManager):
+    pass
+
+
+WorkerRelay.register('get_aggregator', exposed=('submit_many', 'status'))
+WorkerRelay.register('get_fleet_writer', exposed=('ingest_many', 'reset'))
+WorkerRelay.register('get_profile_control', exposed=('register', 'request', 'current'))
+
+
+class ProfileControl:
+    """Broadcasts a profiling request from any worker to all of them"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.action = None
+        self.options = {}
+        self.workers = set()  # pids with a SIGUSR1 handler installed
+
+    def register(self, pid):
+        """Record a worker that is ready to receive profiling requests"""
+        with self.lock:
+            self.workers.add(pid)
+
+    def request(self, action, options=None):
+        """Record the request and signal every registered worker; returns their pids"""
+        alive = {worker.pid for worker in multiprocessing.active_children()}
+        with self.lock:
+            self.action, self.options = action, dict(options or {})
+            # Workers that died (and were replaced by uvicorn) re-register themselves
+            self.workers &= alive
+            pids = sorted(self.workers)
+        for pid in pids:
+            os.kill(pid, signal.SIGUSR1)
+        return pids
+
+    def current(self):
+        with self.lock:
+            return self.action, self.options
+
+
+def serve(aggregator, fleet_writer, authkey):
+    """Serve the supervisor's singletons from a daemon thread; returns (socket address, ProfileControl)"""
+    address = os.path.join(tempfile.gettempdir(), f"iot-ml-relay-{os.getpid()}.sock")
+    if os.path.exists(address):
+        os.unlink(address)
+
+    profile_control = ProfileControl()
+    WorkerRelay.register('get_aggregator', callable=lambda: aggregator,
+                         exposed=('submit_many', 'status'))
+    WorkerRelay.register('get_fleet_writer', callable=lambda: fleet_writer,
+                         exposed=('ingest_many', 'reset'))
+    WorkerRelay.register('get_profile_control', callable=lambda: profile_control,
+                         exposed=('register', 'request', 'current'))
+    server = WorkerRelay(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name='worker-relay', daemon=True).start()
+    return address, profile_control
+
+
+def connect(address, authkey):
+    """Connect a worker to the supervisor's relay"""
+    relay = WorkerRelay(address=address, authkey=authkey)
+    relay.connect()
+    return relay
+
+
+def install_profile_handler(profile_control):
+    """Apply the supervisor's broadcast profiling requests when SIGUSR1 arrives"""
+    logger = logging.getLogger('WorkerRelay')
+
+    def apply_request():
+        action, options = profile_control.current()
+        try:
+            if action == 'start':
+                profiler.start(**options)
+            elif action == 'stop':
+                profiler.stop()
+            else:
+                profiler.toggle()
+        except (ValueError, RuntimeError) as e:
+            logger.warning(f"⚠️ Profiling request '{action}' not applied: {e}")
+
+    signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=apply_request, daemon=True).start())
+    # Only now may the supervisor signal this worker
+    profile_control.register(os.getpid())
+
+
+def install_supervisor_profile_handler(profile_control):
+    """Toggle profiling in every worker when the supervisor receives SIGUSR1"""
+    def toggle(*_):
+        threading.Thread(target=profile_control.request, args=('toggle',), daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, toggle)
+    # Newer uvicorn supervisors replace signal handlers with their own and
+    # dispatch each signal to a handle_<name>() method instead
+    from uvicorn.supervisors.multiprocess import Multiprocess
+    Multiprocess.handle_usr1 = lambda self: toggle()
@@ -0,0 +1,224 @@
+# test_alert_aggregator.py
+"""
+Alert coalescing, bulk flushing and digest retries, against in-memory fakes
+of the Mongo store and the SMTP notifier
+"""
+from datetime import timedelta
+
+import pytest
+
+from services.alert_aggregator import AlertAggregator
+from services.notifier import DigestNotifier
+
+
+class FakeStore:
+    def __init__(self):
+        self.inserted = []
+        self.updated = []
+        self.emailed = []
+        self.emails = {}
+        self.fail_writes = False
+        self.fail_lookups = False
+        self.next_id = 0
+
+    def write(self, new_groups, updated_groups):
+        if self.fail_writes:
+            raise ConnectionError('mongo down')
+        for group in new_groups:
+            self.next_id += 1
+            group['_id'] = self.next_id
+        self.inserted.extend(dict(group) for group in new_groups)
+        self.updated.extend(dict(group) for group in updated_groups)
+
+    def mark_emailed(self, alert_ids):
+        self.emailed.extend(alert_ids)
+
+    def user_emails(self, user_ids):
+        if self.fail_lookups:
+            raise ConnectionError('mongo down')
+        return {user_id: self.emails[user_id] for user_id in user_ids if user_id in self.emails}
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.enqueued = []
+        self.stats = {}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def enqueue(self, groups):
+        self.enqueued.extend(dict(group) for group in groups)
+
+
+def alert(severity='low', alert_type='anomaly', machine_id='MACHINE-001', user_id='u1', **extra):
+    return {'userId': user_id, 'machineId': machine_id, 'alertType': alert_type,
+            'severity': severity, 'message': f"{alert_type} ({severity})", **extra}
+
+
+@pytest.fixture
+def aggregator():
+    return AlertAggregator(store=FakeStore(), notifier=FakeNotifier(), window=300)
+
+
+def test_coalesces_repeats_of_the_same_machine_and_type(aggregator):
+    aggregator.coalesce(alert('low', confidence=0.4))
+    aggregator.coalesce(alert('high', confidence=0.9))
+    aggregator.coalesce(alert('medium', confidence=0.5))
+
+    [group] = aggregator.groups.values()
+    assert group['occurrences'] == 3
+    assert group['severity'] == 'high'  # escalates, never downgrades
+    assert group['confidence'] == 0.9
+    assert group['message'] == 'anomaly (medium)'
+    assert aggregator.stats['coalesced'] == 2
+
+
+def test_keeps_separate_groups_per_user_machine_and_type(aggregator):
+    aggregator.coalesce(alert())
+    aggregator.coalesce(alert(machine_id='MACHINE-002'))
+    aggregator.coalesce(alert(alert_type='temperature'))
+    aggregator.coalesce(alert(user_id='u2'))
+
+    assert len(aggregator.groups) == 4
+
+
+def test_opens_a_new_group_once_the_window_has_passed(aggregator):
+    aggregator.coalesce(alert())
+    aggregator.flush()
+    [group] = aggregator.groups.values()
+    group['lastSeenAt'] -= timedelta(seconds=301)
+
+    aggregator.flush()  # expires the idle group
+    aggregator.coalesce(alert())
+
+    [group] = aggregator.groups.values()
+    assert group['occurrences'] == 1
+    assert group['_id'] is None
+
+
+def test_flush_inserts_new_groups_and_updates_coalesced_ones(aggregator):
+    store = aggregator.store
+    aggregator.coalesce(alert())
+    aggregator.flush()
+    assert len(store.inserted) == 1 and not store.updated
+
+    aggregator.flush()  # nothing dirty
+    assert len(store.inserted) == 1 and not store.updated
+
+    aggregator.coalesce(alert())
+    aggregator.flush()
+    assert len(store.inserted) == 1
+    assert store.updated[0]['occurrences'] == 2
+    assert aggregator.stats['inserted'] == 1 and aggregator.stats['updated'] == 1
+
+
+def test_flush_notifies_digest_severities_and_types_once(aggregator):
+    notifier = aggregator.notifier
+    aggregator.coalesce(alert('low'))
+    aggregator.coalesce(alert('medium', alert_type='failure_prediction'))
+    aggregator.flush()
+    assert [group['alertType'] for group in notifier.enqueued] == ['failure_prediction']
+
+    aggregator.coalesce(alert('critical'))  # escalation reaches a digest severity
+    aggregator.coalesce(alert('medium', alert_type='failure_prediction'))
+    aggregator.flush()
+    assert [(group['alertType'], group['severity']) for group in notifier.enqueued] == [
+        ('failure_prediction', 'medium'), ('anomaly', 'critical')]
+
+    aggregator.coalesce(alert('critical'))
+    aggregator.flush()
+    assert len(notifier.enqueued) == 2
+
+
+def test_failed_write_keeps_groups_dirty_for_the_next_flush(aggregator):
+    aggregator.store.fail_writes = True
+    aggregator.coalesce(alert('critical'))
+    aggregator.flush()
+    assert not aggregator.notifier.enqueued
+    assert all(group['dirty'] for group in aggregator.groups.values())
+
+    aggregator.store.fail_writes = False
+    aggregator.flush()
+    assert len(aggregator.store.inserted) == 1
+    assert len(aggregator.notifier.enqueued) == 1
+
+
+def test_rejects_malformed_alerts_without_stopping(aggregator):
+    aggregator.safe_coalesce({'userId': 'u1'})
+    aggregator.safe_coalesce(alert())
+
+    assert aggregator.stats['rejected'] == 1
+    assert len(aggregator.groups) == 1
+
+
+def test_background_thread_coalesces_and_flushes_on_stop():
+    aggregator = AlertAggregator(store=FakeStore(), notifier=FakeNotifier(), flush_interval=60)
+    aggregator.start()
+    assert aggregator.submit_many([alert('high')] * 3) == 3
+    aggregator.stop()
+
+    assert aggregator.store.inserted[0]['occurrences'] == 3
+    assert aggregator.status()['aggregator']['received'] == 3
+
+
+class FailingNotifier(DigestNotifier):
+    def __init__(self, store, failures):
+        super().__init__(store, interval=60, max_attempts=3)
+        self.failures = failures
+        self.sent = []
+
+    def send_digest(self, to, groups):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('smtp down')
+        self.sent.append((to, [group['_id'] for group in groups]))
+
+
+def group(alert_id, user_id='u1'):
+    return {**alert('critical', user_id=user_id), '_id': alert_id, 'occurrences': 1}
+
+
+def test_notifier_retries_failed_sends():
+    store = FakeStore()
+    store.emails = {'u1': 'ops@example.com'}
+    notifier = FailingNotifier(store, failures=1)
+    notifier.enqueue([group(1), group(2)])
+
+    notifier.send_pending()
+    assert not notifier.sent and notifier.stats['retries'] == 2
+
+    notifier.send_pending()
+    assert notifier.sent == [('ops@example.com', [1, 2])]
+    assert store.emailed == [1, 2]
+
+
+def test_notifier_retries_failed_recipient_lookups():
+    store = FakeStore()
+    store.emails = {'u1': 'ops@example.com'}
+    store.fail_lookups = True
+    notifier = FailingNotifier(store, failures=0)
+    notifier.enqueue([group(1)])
+
+    notifier.send_pending()
+    store.fail_lookups = False
+    notifier.send_pending()
+
+    assert notifier.sent == [('ops@example.com', [1])]
+
+
+def test_notifier_gives_up_after_max_attempts():
+    store = FakeStore()
+    store.emails = {'u1': 'ops@example.com'}
+    notifier = FailingNotifier(store, failures=10)
+    notifier.enqueue([group(1)])
+
+    for _ in range(5):
+        notifier.send_pending()
+
+    assert notifier.stats['send_failures'] == 3
+    assert notifier.stats['abandoned'] == 1
+    assert notifier.queue.empty()
@@ -0,0 +1,235 @@
+# test_fleet_state.py
+"""
+Shared-memory fleet state: seqlock snapshots under concurrent writers in other
+processes, slot reclaiming, reset and segment lifecycle, and the fleet writer
+"""
+import fcntl
+import itertools
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import pytest
+
+from models.anomaly_detection import EWMADetector, RollingZScoreDetector
+from services.fleet_state import FLEET_SENSORS, FleetState, FleetWriter, lock_path
+from services.prediction_service import PredictionService
+
+names = itertools.count()
+
+
+@pytest.fixture
+def segment_name():
+    name = f"iot_fleet_test_{os.getpid()}_{next(names)}"
+    yield name
+    FleetState.discard(name)
+
+
+def reading(value):
+    return {sensor: float(value) for sensor in FLEET_SENSORS}
+
+
+def write_readings(name, machine_id, count, start=None):
+    state = FleetState.open(name)
+    if start is not None:
+        start.wait()
+    ewma = EWMADetector()
+    for i in range(count):
+        state.apply([(machine_id, reading(i), time.time())], ewma)
+    state.close()
+
+
+def read_snapshots(name, machine_id, count, start, results):
+    """Snapshot until the last reading shows up; every sensor of a reading carries the same value"""
+    state = FleetState.open(name)
+    start.wait()
+    torn = 0
+    seen = set()
+    while count not in seen:
+        snapshot = state.snapshot(machine_id)
+        if snapshot is None:
+            continue
+        values, _, _ = snapshot
+        if len(set(values[:, 0])) != 1 or len(set(values[:, 3])) != 1 or values[0, 3] < max(seen, default=0):
+            torn += 1
+        seen.add(values[0, 3])
+    state.close()
+    results.put((torn, len(seen)))
+
+
+def test_apply_then_read(segment_name):
+    state = FleetState.open(segment_name)
+    ewma = EWMADetector()
+    assert state.read('MACHINE-001') is None
+
+    state.apply([('MACHINE-001', {'temperature': 60.0, 'status': 'ok'}, 100.0),
+                 ('MACHINE-001', {'temperature': 70.0}, 101.0)], ewma)
+
+    data = state.read('MACHINE-001')
+    assert data['updated_at'] == 101.0
+    assert list(data['sensors']) == ['temperature']
+    temperature = data['sensors']['temperature']
+    assert temperature['last'] == 70.0 and temperature['count'] == 2
+    assert temperature['mean'] == pytest.approx(ewma.update(70.0, 1, 60.0, 0.0)[1])
+    state.close()
+
+
+def test_score_reads_a_snapshot_while_the_writer_lock_is_held(segment_name):
+    state = FleetState.open(segment_name, window=5)
+    ewma, zscore = EWMADetector(warmup=5), RollingZScoreDetector(window=5)
+    state.apply([('MACHINE-001', {'temperature': 60.0 + i % 2}, time.time()) for i in range(10)], ewma)
+
+    with open(lock_path(segment_name, 'lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # another writer is busy
+        flagged = state.score('MACHINE-001', {'temperature': 95.0}, ewma, zscore)
+        quiet = state.score('MACHINE-001', {'temperature': 60.5}, ewma, zscore)
+
+    assert flagged == {'ewma': {'temperature'}, 'zscore': {'temperature'}}
+    assert quiet == {'ewma': set(), 'zscore': set()}
+    assert state.read('MACHINE-001')['sensors']['temperature']['count'] == 10  # scoring stores nothing
+    state.close()
+
+
+def test_readers_in_other_processes_never_see_torn_rows(segment_name):
+    state = FleetState.open(segment_name)
+    context = multiprocessing.get_context('spawn')
+    start, results = context.Barrier(3), context.Queue()
+    processes = [context.Process(target=write_readings, args=(segment_name, 'MACHINE-001', 5000, start))]
+    processes += [context.Process(target=read_snapshots,
+                                  args=(segment_name, 'MACHINE-001', 5000, start, results))
+                  for _ in range(2)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=60) for _ in range(2)]
+    for process in processes:
+        process.join(timeout=10)
+
+    assert [torn for torn, _ in outcomes] == [0, 0]
+    assert all(seen > 10 for _, seen in outcomes)  # the readers overlapped the writer
+    assert state.read('MACHINE-001')['sensors']['temperature']['count'] == 5000
+    state.close()
+
+
+def test_writers_in_several_processes_are_serialized(segment_name):
+    state = FleetState.open(segment_name)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(3) as pool:
+        pool.starmap(write_readings, [(segment_name, f"MACHINE-00{i}", 1000) for i in range(3)])
+
+    assert sorted(state.machine_ids()) == ['MACHINE-000', 'MACHINE-001', 'MACHINE-002']
+    for machine_id in state.machine_ids():
+        assert state.read(machine_id)['sensors']['voltage']['count'] == 1000
+    state.close()
+
+
+def test_full_segment_reclaims_only_idle_slots(segment_name):
+    state = FleetState.open(segment_name, max_machines=2)
+    other = FleetState.attach(segment_name)  # another worker with its own slot cache
+    ewma = EWMADetector()
+    now = time.time()
+    state.apply([('MACHINE-001', reading(1), now - state.idle_seconds - 1),
+                 ('MACHINE-002', reading(2), now)], ewma)
+    assert other.read('MACHINE-001') is not None
+
+    assert other.holds('MACHINE-001') and not other.holds('MACHINE-003')
+    assert state.apply([('MACHINE-003', reading(3), now)], ewma) == 1
+    assert sorted(state.machine_ids()) == ['MACHINE-002', 'MACHINE-003']
+    assert other.read('MACHINE-001') is None  # its cached slot now belongs to MACHINE-003
+    assert other.read('MACHINE-003')['sensors']['heat']['last'] == 3.0
+
+    # Nothing idle left
+    assert state.apply([('MACHINE-004', reading(4), now)], ewma) == 0
+    assert state.read('MACHINE-004') is None
+    other.close()
+    state.close()
+
+
+def test_machine_ids_longer_than_a_slot_are_not_stored(segment_name):
+    state = FleetState.open(segment_name)
+    machine_id = 'M' * 40
+    assert not state.holds(machine_id)
+    assert state.apply([(machine_id, reading(1), time.time())], EWMADetector()) == 0
+    state.close()
+
+
+def test_reset_frees_every_slot(segment_name):
+    state = FleetState.open(segment_name, max_machines=2)
+    other = FleetState.attach(segment_name)
+    ewma = EWMADetector()
+    state.apply([('MACHINE-001', reading(1), time.time()), ('MACHINE-002', reading(2), time.time())], ewma)
+    assert other.read('MACHINE-002') is not None
+
+    state.reset()
+    assert state.machine_ids() == []
+    assert other.read('MACHINE-002') is None
+
+    assert state.apply([('MACHINE-003', reading(3), time.time())], ewma) == 1
+    assert other.read('MACHINE-003')['sensors']['pressure']['count'] == 1
+    other.close()
+    state.close()
+
+
+def test_last_user_unlinks_and_stale_segments_are_recreated(segment_name):
+    stale = FleetState.create(segment_name, max_machines=2, window=3)
+    stale.shm.close()  # left behind by a crashed service
+
+    first = FleetState.open(segment_name, max_machines=4, window=5)
+    second = FleetState.open(segment_name)
+    assert (first.max_machines, second.max_machines, second.window) == (4, 4, 5)
+
+    first.close()
+    shared_memory.SharedMemory(name=segment_name).close()  # still in use by `second`
+    second.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=segment_name)
+
+
+def test_snapshot_times_out_on_a_stalled_writer(segment_name):
+    state = FleetState.open(segment_name)
+    state.apply([('MACHINE-001', reading(1), time.time())], EWMADetector())
+    state.begin_write(state.slot('MACHINE-001'))  # a writer that died mid-update
+
+    with pytest.raises(TimeoutError):
+        state.snapshot('MACHINE-001', timeout=0.05)
+
+    state.apply([('MACHINE-001', reading(2), time.time())], EWMADetector())  # repairs the seqlock
+    assert state.read('MACHINE-001')['sensors']['humidity']['count'] == 2
+    state.close()
+
+
+def test_writer_forwards_batches_to_the_supervisors_writer(segment_name):
+    state = FleetState.open(segment_name)
+    supervisor = FleetWriter(state, EWMADetector())
+    worker = FleetWriter(state, EWMADetector())
+    worker.connect(supervisor)
+    supervisor.start()
+    worker.start()
+
+    for i in range(50):
+        assert worker.submit('MACHINE-001', reading(i))
+    worker.stop()
+    supervisor.stop()
+
+    assert supervisor.stats['stored'] == 50 and worker.stats['received'] == 50
+    assert state.read('MACHINE-001')['sensors']['temperature']['last'] == 49.0
+    state.close()
+
+
+def test_prediction_falls_back_to_local_detectors_when_full(segment_name):
+    service = PredictionService()
+    service.attach(FleetState.open(segment_name, max_machines=1))
+    hot = {'temperature': 90.0, 'voltage': 220.0}
+
+    for _ in range(3):
+        shared = service.predict('MACHINE-001', hot)
+        service.fleet_writer.flush()
+        local = service.predict('MACHINE-002', hot)
+        service.fleet_writer.flush()
+
+    assert shared['threshold'] == local['threshold'] == ['temperature']
+    assert list(local) == ['threshold', 'ewma', 'zscore']
+    assert service.fleet_state.machine_ids() == ['MACHINE-001']
+    assert service.fleet_writer.stats['overflow'] > 0
+    assert ('MACHINE-002', 'temperature') in service.detectors['ewma'].state
+    service.detach()
@@ -1,7 +1,9 @@
 // server/src/controllers/adminController.js
+const bcrypt = require("bcryptjs");
 const User = require("../models/User");
 const SensorData = require("../models/SensorData");
 const MaintenanceAlert = require("../models/MaintenanceAlert");
+const { generateToken } = require("../utils/jwt");
 
 // @desc    Get all users
 // @route   GET /api/admin/users
@@ -100,6 +102,102 @@ const getUserById = async (req, res) => {
   }
 };
 
+// @desc    Provision users in bulk (e.g. simulator tenants)
+// @route   POST /api/admin/users/bulk
+// @access  Private/Admin
+const bulkCreateUsers = async (req, res) => {
+  try {
+    const { users, issueTokens } = req.body;
+
+    if (!Array.isArray(users) || users.length === 0 || users.length > 1000) {
+      return res.status(400).json({
+        success: false,
+        message: "Provide between 1 and 1000 users",
+      });
+    }
+
+    // Validate plaintext fields before the passwords are hashed
+    for (const userData of users) {
+      const error = new User({ ...userData, role: "user" }).validateSync();
+      if (error) {
+        return res.status(400).json({
+          success: false,
+          message: `Invalid user ${userData.email}: ${error.message}`,
+        });
+      }
+    }
+
+    const emails = users.map((userData) => userData.email.toLowerCase());
+    const existing = await User.find({ email: { $in: emails } }).select("email role isActive +provisioned");
+    const existingEmails = new Set(existing.map((user) => user.email));
+
+    // Tenants usually share a password, so hash each distinct one only once
+    const hashes = new Map();
+    const now = new Date();
+    const docs = [];
+    for (const userData of users) {
+      const email = userData.email.toLowerCase();
+      if (existingEmails.has(email)) continue;
+      existingEmails.add(email);
+
+      if (!hashes.has(userData.password)) {
+        const salt = await bcrypt.genSalt(12);
+        hashes.set(userData.password, await bcrypt.hash(userData.password, salt));
+      }
+
+      docs.push({
+        firstName: userData.firstName,
+        lastName: userData.lastName,
+        email,
+        password: hashes.get(userData.password),
+        role: "user",
+        isActive: true,
+        isEmailVerified: true,
+        provisioned: true,
+        createdAt: now,
+        updatedAt: now,
+      });
+    }
+
+    // Documents were validated above; lean skips re-validating the hashed passwords
+    const created = docs.length > 0
+      ? await User.insertMany(docs, { ordered: false, lean: true })
+      : [];
+
+    // Tokens are only issued for accounts this endpoint created and whose
+    // password nobody has changed since, so admins cannot mint logins for
+    // regular accounts and no per-account bcrypt compare is needed
+    const existingUsers = existing
+      .filter((user) => user.role === "user")
+      .map((user) => ({
+        user,
+        verified: Boolean(issueTokens) && user.isActive && Boolean(user.provisioned),
+      }));
+
+    const provisioned = [
+      ...created.map((user) => ({ user, verified: true })),
+      ...existingUsers,
+    ].map(({ user, verified }) => ({
+      id: user._id,
+      email: user.email,
+      ...(issueTokens && verified ? { token: generateToken({ id: user._id }) } : {}),
+    }));
+
+    res.status(201).json({
+      success: true,
+      created: created.length,
+      existing: existing.length,
+      data: provisioned,
+    });
+  } catch (error) {
+    console.error("Bulk create users error:", error);
+    res.status(500).json({
+      success: false,
+      message: "Server error while provisioning users",
+    });
+  }
+};
+
 // @desc    Update user
 // @route   PUT /api/admin/users/:id
 // @access  Private/Admin
@@ -407,6 +505,7 @@ const getAllAlerts = async (req, res) => {
 
 module.exports = {
   getUsers,
+  bulkCreateUsers,
   getUserById,
   updateUser,
   deleteUser,
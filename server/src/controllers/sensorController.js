@@ -30,8 +30,9 @@ const addSensorData = async (req, res) => {
             workingPeriod
         });
 
-        // Check for anomalies and predict maintenance
-        await predictionService.analyzeAndPredict(sensorData);
+        // Check for anomalies and predict maintenance off the request path;
+        // analyzeAndPredict handles its own errors
+        predictionService.analyzeAndPredict(sensorData);
 
         res.status(201).json({
             success: true,
@@ -47,6 +48,55 @@ const addSensorData = async (req, res) => {
     }
 };
 
+// @desc    Add sensor data in bulk (historical backfill)
+// @route   POST /api/sensor/data/bulk
+// @access  Private
+const addSensorDataBulk = async (req, res) => {
+    try {
+        const { readings } = req.body;
+
+        if (!Array.isArray(readings) || readings.length === 0 || readings.length > 5000) {
+            return res.status(400).json({
+                success: false,
+                message: 'Provide between 1 and 5000 readings'
+            });
+        }
+
+        const docs = readings.map(reading => ({
+            userId: req.user.id,
+            machineId: reading.machineId,
+            motorSpeed: reading.motorSpeed,
+            voltage: reading.voltage,
+            temperature: reading.temperature,
+            heat: reading.heat,
+            workingStatus: reading.workingStatus,
+            workingPeriod: reading.workingPeriod,
+            pressure: reading.pressure,
+            vibration: reading.vibration,
+            humidity: reading.humidity,
+            timestamp: reading.timestamp
+        }));
+
+        // Historical data skips live alerting; invalid rows are reported, not fatal
+        const result = await SensorData.insertMany(docs, { ordered: false, rawResult: true });
+
+        res.status(201).json({
+            success: true,
+            inserted: result.insertedCount,
+            failed: result.mongoose && result.mongoose.validationErrors
+                ? result.mongoose.validationErrors.length
+                : 0
+        });
+
+    } catch (error) {
+        console.error('Add bulk sensor data error:', error);
+        res.status(500).json({
+            success: false,
+            message: 'Server error while adding bulk sensor data'
+        });
+    }
+};
+
 // @desc    Get sensor data for user
 // @route   GET /api/sensor/data
 // @access  Private
@@ -305,6 +355,7 @@ const resolveAlert = async (req, res) => {
 
 module.exports = {
     addSensorData,
+    addSensorDataBulk,
     getSensorData,
     getLatestSensorData,
     getSensorAnalytics,
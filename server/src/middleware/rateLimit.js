@@ -10,6 +10,8 @@ const apiLimiter = rateLimit({
   },
   standardHeaders: true, // Return rate limit info in the `RateLimit-*` headers
   legacyHeaders: false, // Disable the `X-RateLimit-*` headers
+  // Limit per account on authenticated routes so tenants behind one IP don't share a budget
+  keyGenerator: (req) => (req.user ? `user_${req.user.id}` : req.ip),
 });
 
 // Stricter rate limiting for auth routes
@@ -24,7 +26,23 @@ const authLimiter = rateLimit({
   legacyHeaders: false,
 });
 
+// Bulk ingest (historical backfill): fewer, much larger requests. A backfill
+// generates ~25k rows/s, i.e. ~25 requests/s at 1000 rows each, so the default
+// allows each account 3000 requests per minute (50/s) with headroom
+const bulkLimiter = rateLimit({
+  windowMs: parseInt(process.env.BULK_RATE_LIMIT_WINDOW_MS, 10) || 60 * 1000, // 1 minute
+  max: parseInt(process.env.BULK_RATE_LIMIT_MAX, 10) || 3000, // bulk requests per account per windowMs
+  message: {
+    success: false,
+    message: 'Too many bulk requests, please try again later.'
+  },
+  standardHeaders: true,
+  legacyHeaders: false,
+  keyGenerator: (req) => (req.user ? `user_${req.user.id}` : req.ip),
+});
+
 module.exports = {
   apiLimiter,
-  authLimiter
+  authLimiter,
+  bulkLimiter
 };
\ No newline at end of file
@@ -14,7 +14,7 @@ const maintenanceAlertSchema = new mongoose.Schema({
     },
     alertType: {
         type: String,
-        enum: ['temperature', 'vibration', 'wear', 'failure_prediction', 'maintenance_due'],
+        enum: ['temperature', 'voltage', 'vibration', 'wear', 'failure_prediction', 'maintenance_due'],
         required: true
     },
     severity: {
@@ -44,6 +44,12 @@ const maintenanceAlertSchema = new mongoose.Schema({
         type: mongoose.Schema.ObjectId,
         ref: 'User'
     },
+    occurrences: {
+        type: Number,
+        default: 1,
+        min: 1
+    },
+    lastSeenAt: Date,
     emailSent: {
         type: Boolean,
         default: false
@@ -47,6 +47,12 @@ const userSchema = new mongoose.Schema(
       type: Boolean,
       default: false,
     },
+    // Created by the bulk provisioning endpoint and still on its password
+    provisioned: {
+      type: Boolean,
+      default: false,
+      select: false,
+    },
     emailVerificationToken: String,
     resetPasswordToken: String,
     resetPasswordExpire: Date,
@@ -71,6 +77,9 @@ userSchema.path('password').validate(
 userSchema.pre('save', async function (next) {
   if (!this.isModified('password')) return next();
 
+  // A provisioned account whose password changes belongs to someone now
+  if (!this.isNew) this.provisioned = false;
+
   const salt = await bcrypt.genSalt(12); // Stronger than 10
   this.password = await bcrypt.hash(this.password, salt);
   next();
@@ -2,6 +2,7 @@
 const express = require('express');
 const {
     getUsers,
+    bulkCreateUsers,
     getUserById,
     updateUser,
     deleteUser,
@@ -24,6 +25,8 @@ router.use(apiLimiter);
 router.route('/users')
     .get(getUsers);
 
+router.post('/users/bulk', bulkCreateUsers);
+
 router.route('/users/:id')
     .get(getUserById)
     .put(updateUser)
@@ -2,6 +2,7 @@
 const express = require('express');
 const {
     addSensorData,
+    addSensorDataBulk,
     getSensorData,
     getLatestSensorData,
     getSensorAnalytics,
@@ -10,12 +11,19 @@ const {
 } = require('../controllers/sensorController');
 
 const { protect } = require('../middleware/auth');
-const { apiLimiter } = require('../middleware/rateLimit');
+const { apiLimiter, bulkLimiter } = require('../middleware/rateLimit');
 
 const router = express.Router();
 
-// Apply protection and rate limiting to all routes
+// Apply protection to all routes
 router.use(protect);
+
+// Bulk ingest has its own budget, counted per request rather than per reading,
+// and accepts bodies above the 100kb default once the caller is authenticated
+const bulkJson = express.json({ limit: process.env.BULK_JSON_LIMIT || '5mb' });
+router.post('/data/bulk', bulkLimiter, bulkJson, addSensorDataBulk);
+
+// Apply rate limiting to all remaining routes
 router.use(apiLimiter);
 
 router.route('/data')
@@ -38,7 +38,9 @@ app.use(cors({
   origin: process.env.CLIENT_URL,
   credentials: true
 }));
-app.use(express.json());
+// Bulk ingest parses its own, larger bodies after authentication (routes/sensor.js)
+const jsonParser = express.json();
+app.use((req, res, next) => (req.path === '/api/sensor/data/bulk' ? next() : jsonParser(req, res, next)));
 app.use(express.urlencoded({ extended: true }));
 app.use(helmet());
 
@@ -40,19 +40,7 @@ class PredictionService {
                 });
             }
 
-            // Create alerts in database
-            for (const alertData of alerts) {
-                const alert = await MaintenanceAlert.create({
-                    userId: sensorData.userId,
-                    machineId: sensorData.machineId,
-                    ...alertData
-                });
-
-                // Send email notification for critical alerts
-                if (alertData.severity === 'critical' || alertData.severity === 'high') {
-                    await this.sendMaintenanceEmail(alert);
-                }
-            }
+            await this.dispatchAlerts(sensorData, alerts);
 
             // Predictive maintenance based on historical data
             await this.predictMaintenance(sensorData);
@@ -88,17 +76,13 @@ class PredictionService {
             if (recentAvgTemp - olderAvgTemp > 10) {
                 const predictedFailureDate = new Date(Date.now() + 3 * 24 * 60 * 60 * 1000); // 3 days from now
 
-                const alert = await MaintenanceAlert.create({
-                    userId: currentData.userId,
-                    machineId: currentData.machineId,
+                await this.dispatchAlerts(currentData, [{
                     alertType: 'failure_prediction',
                     severity: 'medium',
                     message: `Increasing temperature trend detected. Maintenance recommended.`,
                     predictedFailureDate,
                     confidence: 0.7
-                });
-
-                await this.sendMaintenanceEmail(alert);
+                }]);
             }
 
         } catch (error) {
@@ -106,6 +90,46 @@ class PredictionService {
         }
     }
 
+    async dispatchAlerts(sensorData, alerts) {
+        if (alerts.length === 0) return;
+
+        // Hand alerts to the ML service aggregation stage, which coalesces them
+        // per machine and type, writes them in bulk and sends digest emails
+        if (process.env.ML_SERVICE_URL) {
+            try {
+                const response = await fetch(`${process.env.ML_SERVICE_URL}/api/v1/alerts`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(alerts.map(alertData => ({
+                        userId: sensorData.userId.toString(),
+                        machineId: sensorData.machineId,
+                        ...alertData
+                    }))),
+                    signal: AbortSignal.timeout(5000)
+                });
+
+                if (response.ok) return;
+                console.error(`Alert aggregation failed with HTTP ${response.status}, creating alerts directly`);
+            } catch (error) {
+                console.error('Alert aggregation unavailable, creating alerts directly:', error.message);
+            }
+        }
+
+        for (const alertData of alerts) {
+            const alert = await MaintenanceAlert.create({
+                userId: sensorData.userId,
+                machineId: sensorData.machineId,
+                ...alertData
+            });
+
+            // Send email notification for critical alerts and every failure prediction
+            if (alertData.severity === 'critical' || alertData.severity === 'high' ||
+                alertData.alertType === 'failure_prediction') {
+                await this.sendMaintenanceEmail(alert);
+            }
+        }
+    }
+
     async sendMaintenanceEmail(alert) {
         try {
             const user = await User.findById(alert.userId);